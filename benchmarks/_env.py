@@ -0,0 +1,14 @@
+"""Dummy settings so the benchmarks can import ``rbot`` without a ``.env``."""
+
+import os
+
+for name, value in {
+    "REDIS_URL": "redis://127.0.0.1:6379/0",
+    "LIST_OF_ADMINS": "1234",
+    "TELEGRAM_TOKEN": "blah",
+    "TELEGRAM_EDUZEN_ID": "1234",
+    "TMDB_API_KEY": "blah",
+    "RADARR_API_KEY": "blah",
+    "RADARR_URL": "http://radarr.local/api/v3/",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,81 @@
+"""Throughput of turning raw TMDB search results into ``Movie``/``Serie`` models.
+
+Runs ``process_movie_search_results``/``process_serie_search_results`` over 10k
+synthetic TMDB records (one in a hundred invalid, like real search results)::
+
+    python -m benchmarks.bench_models
+"""
+
+import asyncio
+import logging
+import time
+
+from benchmarks import _env  # noqa: F401
+from rbot.storage.models import (
+    process_movie_search_results,
+    process_serie_search_results,
+)
+
+RECORDS = 10_000
+ROUNDS = 5
+
+
+def tmdb_movie(idx: int) -> dict:
+    return {
+        "adult": False,
+        "backdrop_path": f"/backdrop{idx}.jpg",
+        "genre_ids": [18, 80],
+        "id": idx,
+        "original_language": "en",
+        "original_title": f"Movie {idx}",
+        "overview": "A perfectly ordinary film.",
+        "popularity": 12.5,
+        "poster_path": f"/poster{idx}.jpg",
+        "release_date": f"{1950 + idx % 70}-03-31",
+        "title": f"Movie {idx}",
+        "video": False,
+        "vote_average": 0 if idx % 100 == 0 else 5 + idx % 5 + 0.25,
+        "vote_count": idx,
+    }
+
+
+def tmdb_serie(idx: int) -> dict:
+    return {
+        "backdrop_path": f"/backdrop{idx}.jpg",
+        "first_air_date": f"{1950 + idx % 70}-04-17",
+        "id": idx,
+        "name": f"Serie {idx}",
+        "poster_path": f"/poster{idx}.jpg",
+        "vote_average": 0 if idx % 100 == 0 else 5 + idx % 5 + 0.25,
+        "vote_count": idx,
+    }
+
+
+async def run(name: str, process, records: list[dict]) -> None:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        results = await process(records)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{name:<7} records={len(records)} valid={len(results)} "
+        f"best={best * 1000:7.1f}ms ({len(records) / best:,.0f} records/s)"
+    )
+
+
+async def main() -> None:
+    logging.disable(logging.ERROR)
+    await run(
+        "movies",
+        process_movie_search_results,
+        [tmdb_movie(idx) for idx in range(RECORDS)],
+    )
+    await run(
+        "series",
+        process_serie_search_results,
+        [tmdb_serie(idx) for idx in range(RECORDS)],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""Bytes and latency of downloading posters at each TMDB size.
+
+A typical search session shows a handful of cards; this downloads the posters
+of those cards at ``original`` (what the bot used to send) and at the size of
+each rendering context, the same download Telegram does for every new poster.
+Needs network access to image.tmdb.org::
+
+    python -m benchmarks.bench_poster_sizes [poster_path ...]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+
+from benchmarks import _env  # noqa: F401
+from rbot.conf import settings
+from rbot.tmdb.images import DEFAULT_BASE_URL
+
+# example poster paths; pass the ones of a real search session as arguments
+SESSION = [
+    "/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg",
+    "/aA5qHS0FbSXO8PxcxUIHbDrJyuh.jpg",
+    "/8c4a8kE7PizaGQQnditMmI1xbRp.jpg",
+    "/aZiK8HJ8wfb8LZD0fWQhUUbEJ0f.jpg",
+    "/dXNAPwY7VrqMAo51EKhhCJfaGb5.jpg",
+]
+
+
+async def download(client: httpx.AsyncClient, size: str, paths: list[str]) -> None:
+    total = 0
+    start = time.perf_counter()
+    for path in paths:
+        response = await client.get(f"{DEFAULT_BASE_URL}{size}{path}")
+        response.raise_for_status()
+        total += len(response.content)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{size:<9} posters={len(paths)} bytes={total / 1024:9.1f}KiB "
+        f"latency={elapsed / len(paths) * 1000:7.1f}ms/poster"
+    )
+
+
+async def main() -> None:
+    paths = sys.argv[1:] or SESSION
+    sizes = ["original", *dict.fromkeys(settings.POSTER_SIZES.values())]
+    async with httpx.AsyncClient(timeout=30) as client:
+        for size in sizes:
+            await download(client, size, paths)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Peak RSS of reading a large Radarr ``/movie`` listing, buffered vs streamed.
+
+Each mode runs in its own subprocess against a synthetic library served by an
+``httpx.MockTransport`` that generates the body on the fly::
+
+    python -m benchmarks.bench_radarr_stream [movies]
+"""
+
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks import _env  # noqa: F401
+from rbot.radarr.api import RadarrClient
+
+MOVIES = 50_000
+
+
+def synthetic_movie(idx: int) -> dict:
+    return {
+        "id": idx,
+        "tmdbId": 100_000 + idx,
+        "title": f"Synthetic movie number {idx}",
+        "originalTitle": f"Synthetic movie number {idx}",
+        "overview": "A perfectly ordinary film. " * 10,
+        "year": 1950 + idx % 70,
+        "hasFile": idx % 3 == 0,
+        "monitored": True,
+        "path": f"/media-center/movies/Synthetic movie number {idx}",
+        "images": [
+            {"coverType": "poster", "remoteUrl": f"https://image.tmdb.org/{idx}.jpg"}
+        ],
+        "ratings": {"imdb": {"votes": idx, "value": 5 + idx % 5, "type": "user"}},
+        "genres": ["Drama", "Comedy"],
+    }
+
+
+async def body(movies: int):
+    yield b"["
+    for idx in range(movies):
+        prefix = b"," if idx else b""
+        yield prefix + json.dumps(synthetic_movie(idx)).encode()
+    yield b"]"
+
+
+async def run(mode: str, movies: int) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body(movies))
+
+    client = RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "buffered":
+        count = len(await client.get_movies_from_radarr())
+    else:
+        count = 0
+        async for _ in client.iter_movies_from_radarr():
+            count += 1
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    await client.close()
+    print(
+        f"{mode:<9} movies={count} time={elapsed:5.2f}s "
+        f"peak_rss={peak / 1024:7.1f}MiB (+{(peak - baseline) / 1024:.1f}MiB)"
+    )
+
+
+def main() -> None:
+    movies = int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES
+    for mode in ("buffered", "streamed"):
+        subprocess.run(
+            [sys.executable, "-m", __spec__.name, "--run", mode, str(movies)],  # type: ignore
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        asyncio.run(run(sys.argv[2], int(sys.argv[3])))
+    else:
+        main()
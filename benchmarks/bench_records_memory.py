@@ -0,0 +1,64 @@
+"""Bytes per title of keeping a library resident as models vs ``TitleRecord``.
+
+Measured with ``tracemalloc`` over Radarr-shaped movies, including the dict
+that indexes them by tmdbId::
+
+    python -m benchmarks.bench_records_memory
+"""
+
+import gc
+import tracemalloc
+
+from benchmarks import _env  # noqa: F401
+from rbot.storage.models import Movie
+from rbot.storage.records import TitleRecord
+
+SIZES = (10_000, 100_000)
+
+
+def radarr_movie(idx: int) -> dict:
+    return {
+        "id": idx,
+        "tmdbId": 100_000 + idx,
+        "title": f"Synthetic movie number {idx}",
+        "year": 1950 + idx % 70,
+        "poster_path": f"/poster{idx}.jpg",
+        "ratings": {
+            "imdb": {"votes": idx, "value": 5 + idx % 50 / 10, "type": "user"},
+            "tmdb": {"votes": idx, "value": 5 + idx % 40 / 10, "type": "user"},
+        },
+    }
+
+
+def measure(build, size: int) -> float:
+    raw = [radarr_movie(idx) for idx in range(size)]
+    gc.collect()
+    tracemalloc.start()
+    index = build(raw)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+    return current / size
+
+
+def models(raw: list[dict]) -> dict:
+    return {item["tmdbId"]: Movie(**item) for item in raw}
+
+
+def records(raw: list[dict]) -> dict:
+    return {item["tmdbId"]: TitleRecord.from_model(Movie(**item)) for item in raw}
+
+
+def main() -> None:
+    for size in SIZES:
+        model_bytes = measure(models, size)
+        record_bytes = measure(records, size)
+        print(
+            f"{size:>7} titles: Movie {model_bytes:6.0f} B/title, "
+            f"TitleRecord {record_bytes:6.0f} B/title "
+            f"({model_bytes / record_bytes:.1f}x smaller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
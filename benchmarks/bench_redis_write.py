@@ -0,0 +1,65 @@
+"""Round-trips and wall time to store one search result set in Redis.
+
+Compares the old per-result ``pipe.set(...).execute()`` loop with the batched
+``write_movies_to_redis``, against ``RespStub`` with 1ms of emulated latency::
+
+    python -m benchmarks.bench_redis_write
+"""
+
+import asyncio
+import time
+
+from benchmarks import _env  # noqa: F401
+from benchmarks.resp_stub import RespStub
+from rbot.storage.models import Movie, Serie
+from rbot.storage.redis import RedisPool, pool, write_movies_to_redis
+
+RESULTS = 20
+LATENCY = 0.001
+
+
+async def legacy_write(results: list[Movie] | list[Serie]) -> None:
+    async with pool.client.pipeline(transaction=True) as pipe:
+        for idx, result in enumerate(results):
+            await pipe.set(str(idx), result.model_dump_json()).execute()
+
+
+async def batched_write(results: list[Movie] | list[Serie]) -> None:
+    kind = "serie" if isinstance(results[0], Serie) else "movie"
+    await write_movies_to_redis("rbot:search:1:bench", results, kind, ttl=60)
+
+
+async def run(stub: RespStub, name: str, writer, results) -> None:
+    stub.reset()
+    start = time.perf_counter()
+    await writer(results)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<28} round-trips={stub.round_trips:>3} "
+        f"commands={stub.commands:>3} time={elapsed * 1000:6.1f}ms"
+    )
+
+
+async def main() -> None:
+    movies = [
+        Movie(id=i, title=f"Movie {i}", release_date="1999-03-31", vote_average=7)
+        for i in range(RESULTS)
+    ]
+    series = [
+        Serie(id=i, name=f"Serie {i}", first_air_date="2011-04-17", vote_average=8)
+        for i in range(RESULTS)
+    ]
+    async with RespStub(latency=LATENCY) as stub:
+        redis_pool = RedisPool(stub.url)
+        pool._client = redis_pool.client
+        await pool.client.ping()
+
+        for label, results in (("movies", movies), ("series", series)):
+            await run(stub, f"legacy {label} x{RESULTS}", legacy_write, results)
+            await run(stub, f"batched {label} x{RESULTS}", batched_write, results)
+
+        await redis_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
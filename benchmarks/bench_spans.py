@@ -0,0 +1,54 @@
+"""Overhead of the latency spans wrapped around handlers and backend calls.
+
+Times an empty ``with span(...)`` block, and the ``labels()`` lookup plus span
+that instrumented code actually pays, against the 5µs per call budget::
+
+    python -m benchmarks.bench_spans
+"""
+
+import time
+
+from benchmarks import _env  # noqa: F401
+from rbot.metrics import handler_latency, registry, span
+
+CALLS = 1_000_000
+ROUNDS = 5
+BUDGET = 5e-6
+
+
+def bare() -> None:
+    histogram = handler_latency.labels("bench")
+    for _ in range(CALLS):
+        with span(histogram):
+            pass
+
+
+def labelled() -> None:
+    for _ in range(CALLS):
+        with span(handler_latency.labels("bench")):
+            pass
+
+
+def run(name: str, loop) -> None:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        loop()
+        best = min(best, time.perf_counter() - start)
+    per_call = best / CALLS
+    verdict = "ok" if per_call < BUDGET else "OVER BUDGET"
+    print(f"{name:>10}: {per_call * 1e9:7.0f} ns/span ({verdict})")
+
+
+def main() -> None:
+    run("span", bare)
+    run("labels", labelled)
+    start = time.perf_counter()
+    body = registry.render()
+    print(
+        f"{'render':>10}: {(time.perf_counter() - start) * 1e3:.2f} ms, {len(body)} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""A tiny in-process Redis stand-in speaking just enough RESP for benchmarks.
+
+It keeps no data: every command gets a plausible reply (``+OK``, ``+PONG``, an integer,
+or the queued replies on ``EXEC``). What it does keep is ``round_trips``, the number
+of client writes it had to answer, plus an optional ``latency`` added to every
+reply to emulate the network between the bot and a real Redis.
+"""
+
+import asyncio
+
+
+class RespStub:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.round_trips = 0
+        self.commands = 0
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]  # type: ignore
+        return f"redis://{host}:{port}/0"
+
+    async def __aenter__(self) -> "RespStub":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        self._server.close()  # type: ignore
+        await self._server.wait_closed()  # type: ignore
+
+    def reset(self) -> None:
+        self.round_trips = 0
+        self.commands = 0
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> list[bytes]:
+        header = await reader.readline()
+        if not header:
+            raise ConnectionResetError
+        args = []
+        for _ in range(int(header[1:])):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    def _reply(self, command: bytes) -> bytes:
+        if command in (b"HSET", b"EXPIRE", b"DEL", b"RPUSH"):
+            return b":1\r\n"
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command in (b"GET", b"HGET"):
+            return b"$-1\r\n"
+        return b"+OK\r\n"
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        queued: list[bytes] | None = None
+        try:
+            while True:
+                args = await self._read_command(reader)
+                self.commands += 1
+                command = args[0].upper()
+                if command == b"MULTI":
+                    queued = []
+                    reply = b"+OK\r\n"
+                elif command == b"EXEC":
+                    reply = b"*%d\r\n" % len(queued or []) + b"".join(queued or [])
+                    queued = None
+                elif queued is not None:
+                    queued.append(self._reply(command))
+                    reply = b"+QUEUED\r\n"
+                else:
+                    reply = self._reply(command)
+                writer.write(reply)
+                if not reader._buffer:  # type: ignore
+                    self.round_trips += 1
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    await writer.drain()
+        except (
+            ConnectionResetError,
+            asyncio.IncompleteReadError,
+            asyncio.CancelledError,
+        ):
+            writer.close()
@@ -1,11 +1,22 @@
+import argparse
+import asyncio
 import logging
 
 from rich.logging import RichHandler
-from telegram.ext import ApplicationBuilder, CallbackQueryHandler, CommandHandler
+from telegram.ext import (
+    ApplicationBuilder,
+    CallbackQueryHandler,
+    CommandHandler,
+    MessageHandler,
+    filters,
+)
 
 from rbot.conf import settings
-from rbot.handlers import callback, help, movie, search, serie
-from rbot.utils import post_init
+from rbot.handlers import add, callback, help, movie, search, serie, stats
+from rbot.processor import ChatOrderedUpdateProcessor
+from rbot.ratelimit import SendScheduler
+from rbot.utils import post_init, post_shutdown
+from rbot.webhook import run_webhook
 
 logging.basicConfig(
     level="INFO",
@@ -18,10 +29,35 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 
-def main() -> int:
-    application = (
-        ApplicationBuilder().token(settings.TELEGRAM_TOKEN).post_init(post_init).build()
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="rbot", description="Radarr Telegram bot")
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        choices=("polling", "webhook"),
+        default="polling",
+        help="how to receive updates from Telegram (default: polling)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    builder = (
+        ApplicationBuilder()
+        .token(settings.TELEGRAM_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        .rate_limiter(SendScheduler())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
     )
+    if args.mode == "webhook":
+        # updates come from WebhookApp, through a bounded queue for backpressure
+        builder = builder.updater(None).update_queue(
+            asyncio.Queue(maxsize=settings.WEBHOOK_MAX_QUEUE)
+        )
+    application = builder.build()
     help_handler = CommandHandler("help", help)
 
     application.add_handler(help_handler)
@@ -35,13 +71,27 @@ def main() -> int:
     serie_handler = CommandHandler("serie", serie)
     application.add_handler(serie_handler)
 
+    add_handler = CommandHandler("add", add)
+    application.add_handler(add_handler)
+
+    add_file_handler = MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/add\b"), add
+    )
+    application.add_handler(add_file_handler)
+
+    stats_handler = CommandHandler("stats", stats)
+    application.add_handler(stats_handler)
+
     callback_handler = CallbackQueryHandler(callback)
     application.add_handler(callback_handler)
 
     try:
-        application.run_polling()
+        if args.mode == "webhook":
+            run_webhook(application)
+        else:
+            application.run_polling()
     except Exception:
-        log.exception("Error while polling")
+        log.exception("Error while receiving updates")
         return -1
 
     return 0
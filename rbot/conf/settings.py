@@ -2,6 +2,31 @@ from decouple import Csv, config
 
 # REDIS_HOST = config("REDIS_HOST", cast=str)
 REDIS_URL = config("REDIS_URL", cast=str)
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=20, cast=int)
+REDIS_POOL_TIMEOUT = config("REDIS_POOL_TIMEOUT", default=5.0, cast=float)
+REDIS_HEALTH_CHECK_INTERVAL = config(
+    "REDIS_HEALTH_CHECK_INTERVAL", default=30, cast=int
+)
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=5.0, cast=float)
+REDIS_SOCKET_CONNECT_TIMEOUT = config(
+    "REDIS_SOCKET_CONNECT_TIMEOUT", default=5.0, cast=float
+)
+
+SEARCH_SESSION_TTL = config("SEARCH_SESSION_TTL", default=60 * 60, cast=int)
+# one message per result, paged in place with "Next"
+SEARCH_CAROUSEL = config("SEARCH_CAROUSEL", default=True, cast=bool)
+# load the next TMDB page once "Next" gets this close to the last stored result
+SEARCH_PREFETCH_MARGIN = config("SEARCH_PREFETCH_MARGIN", default=5, cast=int)
+# warm the next result of each chat in the background, 0 disables it
+PREFETCH_CONCURRENCY = config("PREFETCH_CONCURRENCY", default=4, cast=int)
+PREFETCH_TTL = config("PREFETCH_TTL", default=5 * 60, cast=int)
+PREFETCH_MAX_CHATS = config("PREFETCH_MAX_CHATS", default=1000, cast=int)
+# send the top results as one album instead, 0 disables it (Telegram allows 2-10)
+SEARCH_ALBUM_SIZE = min(config("SEARCH_ALBUM_SIZE", default=0, cast=int), 10)
+
+# updates of different chats run concurrently, those of one chat in order
+UPDATE_WORKERS = config("UPDATE_WORKERS", default=8, cast=int)
+UPDATE_MAX_PENDING = config("UPDATE_MAX_PENDING", default=256, cast=int)
 
 LIST_OF_ADMINS = config("LIST_OF_ADMINS", cast=Csv(int))
 
@@ -9,6 +34,30 @@ TELEGRAM_TOKEN = config("TELEGRAM_TOKEN", cast=str)
 
 TELEGRAM_EDUZEN_ID = config("TELEGRAM_EDUZEN_ID", cast=int)
 
+# outbound Telegram limits (rbot.ratelimit): messages per second and burst
+TELEGRAM_GLOBAL_RATE = config("TELEGRAM_GLOBAL_RATE", default=30.0, cast=float)
+TELEGRAM_CHAT_RATE = config("TELEGRAM_CHAT_RATE", default=1.0, cast=float)
+TELEGRAM_GROUP_RATE = config("TELEGRAM_GROUP_RATE", default=20 / 60, cast=float)
+TELEGRAM_CHAT_BURST = config("TELEGRAM_CHAT_BURST", default=3, cast=int)
+TELEGRAM_MAX_RETRIES = config("TELEGRAM_MAX_RETRIES", default=3, cast=int)
+
+# Prometheus text metrics on http://METRICS_HOST:METRICS_PORT/metrics, off unless
+# a port is set (9464 is the usual one); 0.0.0.0 to scrape from another host
+METRICS_HOST = config("METRICS_HOST", default="127.0.0.1", cast=str)
+METRICS_PORT = config("METRICS_PORT", default=0, cast=int)
+
+# webhook mode (``python rbot webhook``), needs the ``webhook`` extra
+WEBHOOK_URL = config("WEBHOOK_URL", default="", cast=str)
+WEBHOOK_PATH = config("WEBHOOK_PATH", default="/telegram", cast=str)
+# checked on every update, a random one is used when empty
+WEBHOOK_SECRET = config("WEBHOOK_SECRET", default="", cast=str)
+WEBHOOK_HOST = config("WEBHOOK_HOST", default="0.0.0.0", cast=str)
+WEBHOOK_PORT = config("WEBHOOK_PORT", default=8080, cast=int)
+# Telegram's concurrent deliveries, and updates buffered before pushing back
+WEBHOOK_MAX_CONNECTIONS = config("WEBHOOK_MAX_CONNECTIONS", default=40, cast=int)
+WEBHOOK_MAX_QUEUE = config("WEBHOOK_MAX_QUEUE", default=256, cast=int)
+WEBHOOK_QUEUE_TIMEOUT = config("WEBHOOK_QUEUE_TIMEOUT", default=10.0, cast=float)
+
 LOG_FORMAT = "%(message)s"
 
 DATE_FORMAT = "[%Y-%m-%d %X]"
@@ -17,3 +66,58 @@ RADARR_API_KEY = config("RADARR_API_KEY", cast=str)
 RADARR_BASE_URL = config("RADARR_URL", cast=str)  # http://radarr.local/api/v3/
 RADARR_ROOT_FOLDER = "/media-center/movies/"
 QUALITY_PROFILE_ANY = 1  # http://radarr.local/api/v3/qualityprofile
+RADARR_TIMEOUT = config("RADARR_TIMEOUT", default=30.0, cast=float)
+RADARR_CONNECT_TIMEOUT = config("RADARR_CONNECT_TIMEOUT", default=5.0, cast=float)
+RADARR_MAX_CONNECTIONS = config("RADARR_MAX_CONNECTIONS", default=10, cast=int)
+RADARR_MAX_KEEPALIVE_CONNECTIONS = config(
+    "RADARR_MAX_KEEPALIVE_CONNECTIONS", default=5, cast=int
+)
+
+TMDB_HTTP2 = config("TMDB_HTTP2", default=True, cast=bool)
+TMDB_TIMEOUT = config("TMDB_TIMEOUT", default=10.0, cast=float)
+TMDB_CONNECT_TIMEOUT = config("TMDB_CONNECT_TIMEOUT", default=5.0, cast=float)
+TMDB_MAX_CONNECTIONS = config("TMDB_MAX_CONNECTIONS", default=20, cast=int)
+TMDB_MAX_KEEPALIVE_CONNECTIONS = config(
+    "TMDB_MAX_KEEPALIVE_CONNECTIONS", default=10, cast=int
+)
+# send a second TMDB GET when the first has not answered after this long, 0 disables
+TMDB_HEDGE_AFTER = config("TMDB_HEDGE_AFTER", default=0.0, cast=float)
+
+TMDB_CACHE_SIZE = config("TMDB_CACHE_SIZE", default=512, cast=int)
+TMDB_CACHE_SEARCH_TTL = config("TMDB_CACHE_SEARCH_TTL", default=6 * 60 * 60, cast=int)
+TMDB_CACHE_DETAIL_TTL = config("TMDB_CACHE_DETAIL_TTL", default=24 * 60 * 60, cast=int)
+TMDB_CACHE_NEGATIVE_TTL = config("TMDB_CACHE_NEGATIVE_TTL", default=10 * 60, cast=int)
+
+# "Confirm" adds run on this many background workers, 0 adds inline
+ADD_JOB_WORKERS = config("ADD_JOB_WORKERS", default=4, cast=int)
+ADD_JOB_MAX_ATTEMPTS = config("ADD_JOB_MAX_ATTEMPTS", default=5, cast=int)
+ADD_JOB_BACKOFF = config("ADD_JOB_BACKOFF", default=2.0, cast=float)
+ADD_JOB_MAX_BACKOFF = config("ADD_JOB_MAX_BACKOFF", default=60.0, cast=float)
+# a title can only be queued once per this many seconds
+ADD_JOB_DEDUP_TTL = config("ADD_JOB_DEDUP_TTL", default=60 * 60, cast=int)
+# outbound HTTP resilience (rbot.transport), shared by the TMDB and Radarr clients
+HTTP_RETRIES = config("HTTP_RETRIES", default=2, cast=int)
+HTTP_RETRY_BACKOFF = config("HTTP_RETRY_BACKOFF", default=0.2, cast=float)
+HTTP_RETRY_BUDGET_RATIO = config("HTTP_RETRY_BUDGET_RATIO", default=0.2, cast=float)
+HTTP_BREAKER_FAILURES = config("HTTP_BREAKER_FAILURES", default=5, cast=int)
+HTTP_BREAKER_RESET_TIMEOUT = config(
+    "HTTP_BREAKER_RESET_TIMEOUT", default=30.0, cast=float
+)
+# bulk /add: concurrent adds, biggest list accepted, seconds between progress edits
+BULK_ADD_CONCURRENCY = config("BULK_ADD_CONCURRENCY", default=4, cast=int)
+BULK_ADD_MAX_IDS = config("BULK_ADD_MAX_IDS", default=5000, cast=int)
+BULK_ADD_PROGRESS_INTERVAL = config(
+    "BULK_ADD_PROGRESS_INTERVAL", default=3.0, cast=float
+)
+RADARR_LIBRARY_SYNC_INTERVAL = config(
+    "RADARR_LIBRARY_SYNC_INTERVAL", default=5 * 60, cast=int
+)
+
+# rendering context -> TMDB image size, see rbot.tmdb.images
+POSTER_SIZES = dict(
+    item.split(":")
+    for item in config(
+        "POSTER_SIZES", default="card:w500,album:w342,thumb:w185", cast=Csv()
+    )
+)
+POSTER_CACHE_SIZE = config("POSTER_CACHE_SIZE", default=10_000, cast=int)
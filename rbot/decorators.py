@@ -5,6 +5,7 @@ from telegram import Update, User
 from telegram.ext import ContextTypes
 
 from rbot.conf import settings
+from rbot.metrics import handler_latency, span
 
 log = logging.getLogger(__name__)
 
@@ -14,6 +15,8 @@ async def get_userdata(user: User) -> tuple[str, str]:
 
 
 def restricted(func):
+    latency = handler_latency.labels(func.__name__)
+
     @wraps(func)
     async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE):
         func_name = func.__name__
@@ -22,6 +25,7 @@ def restricted(func):
             log.warning(f"'{func_name}' Access Denied to: {user_data}")
             return
         log.info(f"'{func_name}' Access Granted to: {user_data}")
-        return await func(update, context)
+        with span(latency):
+            return await func(update, context)
 
     return wrapped
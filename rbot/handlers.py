@@ -1,21 +1,34 @@
 import json
 import logging
 
-from decorators import restricted
-from storage.redis import clear_redis, write_movies_to_redis
 from telegram import Update, error
 from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
-from tmdb import api as tmdb_api
 
 from rbot.conf import settings
+from rbot.decorators import restricted
+from rbot.radarr import api as radarr_api
+from rbot.radarr.bulk import parse_ids
+from rbot.radarr.jobs import add_jobs
+from rbot.radarr.library import library
+from rbot.storage.models import Movie, Serie
+from rbot.storage.posters import posters
+from rbot.storage.sessions import create_session
+from rbot.tmdb import api as tmdb_api
 from rbot.utils import (
-    accepted_movie,
-    accepted_serie,
+    SearchExpired,
+    confirm,
+    edit_card,
+    movie_caption,
+    pages,
+    prefetch_result,
+    prefetcher,
+    run_bulk_add,
     send_buttons,
     send_message,
     send_movie,
-    send_photo,
+    send_poster,
+    send_results,
     send_serie,
     show_next_movie,
 )
@@ -32,29 +45,35 @@ async def callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # CallbackQueries need to be answered, even if no notification to the user is needed
     # Some clients may have trouble otherwise. See https://core.telegram.org/bots/api#callbackquery
     try:
-        await query.answer()  # type: ignore
         chat_id = query.message.chat_id  # type: ignore
-
-        await bot.send_chat_action(action=ChatAction.TYPING, chat_id=chat_id)
-
-        log.info("Callback query answered, data: %s", query.data)
+        log.info("Callback query received, data: %s", query.data)
         dict_data = json.loads(query.data)
 
-        if "movie_id" in dict_data.keys():
-            response = await accepted_movie(dict_data)
-            await query.edit_message_text(text=response)
-        elif "serie_id" in dict_data.keys():
-            response = await accepted_serie(dict_data)
-            await query.edit_message_text(text=response)
+        if "movie_id" in dict_data.keys() or "serie_id" in dict_data.keys():
+            prefetcher.cancel(chat_id)
+            await query.answer()  # type: ignore
+            await confirm(query, dict_data)  # type: ignore
         else:
-            data = await show_next_movie(dict_data)
+            try:
+                data = await show_next_movie(chat_id, dict_data)
+            except SearchExpired:
+                await query.answer("This search expired, please search again")  # type: ignore
+                return
             if not data:
-                await query.edit_message_text(text="No more movies to show")
+                await query.answer("No more results to show")  # type: ignore
             else:
-                idx, movie = data
-                await query.edit_message_text(text="Loading...")
-
-                await send_movie(bot, chat_id, movie, idx)
+                await query.answer()  # type: ignore
+                idx, movie, file_id = data
+                search_id = dict_data["sid"]
+                if settings.SEARCH_CAROUSEL:
+                    await edit_card(query, movie, idx, search_id, file_id)  # type: ignore
+                else:
+                    await query.edit_message_text(text="Loading...")
+                    if isinstance(movie, Serie):
+                        await send_serie(bot, chat_id, movie, idx, search_id)
+                    else:
+                        await send_movie(bot, chat_id, movie, idx, search_id)
+                prefetch_result(chat_id, search_id, idx + 1)
     except error.BadRequest as e:
         log.exception("Error while answering callback query")
         await send_message(bot, settings.TELEGRAM_EDUZEN_ID, str(e))
@@ -66,7 +85,6 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     bot = context.bot
 
     await bot.send_chat_action(action=ChatAction.TYPING, chat_id=chat_id)
-    await clear_redis()
 
     args: list[str] | None = context.args
     if not args:
@@ -77,14 +95,15 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     log.debug(query)
 
     try:
-        data = await tmdb_api.search_movie(query)
+        page = await tmdb_api.search_movie_page(query)
+        data = page.results
         if not data:
             await send_message(bot, chat_id, "No movie found")
             return
 
-        movie = data[0]
-        await write_movies_to_redis(data)
-        await send_movie(bot, chat_id, movie)
+        search_id = await create_session(chat_id, data, query, page.total_pages)
+        shown = await send_results(bot, chat_id, data, search_id=search_id)
+        prefetch_result(chat_id, search_id, shown)
 
     except Exception:
         log.exception("Error while searching movie")
@@ -97,19 +116,19 @@ async def movie(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     bot = context.bot
 
     await bot.send_chat_action(action=ChatAction.TYPING, chat_id=chat_id)
-    await clear_redis()
 
     args: list[str] | None = context.args
     if not args:
         await send_message(bot, chat_id, "missing movie id")
         return
 
-    movie_id = args[0]
-
     try:
-        movie = await tmdb_api.get_movie_detail(movie_id)
-        await send_photo(bot, chat_id, movie.poster, caption=str(movie))
-        await send_buttons(bot, chat_id, "Is this the movie?", callback_data=movie.id)
+        movie = await tmdb_api.get_movie_detail(int(args[0]))
+        if not isinstance(movie, Movie):
+            await send_message(bot, chat_id, "No movie found")
+            return
+        await send_poster(bot, chat_id, movie, caption=movie_caption(movie))
+        await send_buttons(bot, chat_id, "Is this the movie?", movie_id=movie.id)
     except Exception:
         log.exception("Error while getting movie detail")
         await send_message(bot, chat_id, "Something went wrong")
@@ -132,20 +151,79 @@ async def serie(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     log.debug(query_serie)
 
     try:
-        data = await tmdb_api.search_serie(query_serie)
+        page = await tmdb_api.search_serie_page(query_serie)
+        data = page.results
         if not data:
             await send_message(bot, chat_id, "No serie found")
             return
 
-        serie = data[0]
-        await write_movies_to_redis(data)
-        await send_serie(bot, chat_id, serie)
+        search_id = await create_session(chat_id, data, query_serie, page.total_pages)
+        shown = await send_results(bot, chat_id, data, search_id=search_id)
+        prefetch_result(chat_id, search_id, shown)
 
     except Exception:
         log.exception("Error while searching movie")
         await send_message(bot, chat_id, "Something went wrong")
 
 
+@restricted
+async def add(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Bulk add: ``/add <id> <id>...`` or a text/CSV document captioned ``/add``.
+
+    The document can also be sent first and ``/add`` sent as a reply to it.
+    """
+    chat_id = update.effective_chat.id  # type: ignore
+    bot = context.bot
+    message = update.effective_message
+    document = message.document or (  # type: ignore
+        message.reply_to_message and message.reply_to_message.document  # type: ignore
+    )
+
+    if document:
+        file = await document.get_file()
+        text = (await file.download_as_bytearray()).decode("utf-8-sig", "replace")
+    else:
+        text = " ".join(context.args or [])
+    ids = parse_ids(text)
+
+    if not ids:
+        await send_message(bot, chat_id, "Send some tmdb ids, or a text/csv file")
+        return
+    if len(ids) > settings.BULK_ADD_MAX_IDS:
+        limit = settings.BULK_ADD_MAX_IDS
+        await send_message(bot, chat_id, f"Too many ids, the limit is {limit}")
+        return
+
+    # in the background: the chat's next updates must not wait for the import
+    context.application.create_task(
+        run_bulk_add(bot, chat_id, ids), update=update, name=f"bulk-add-{chat_id}"
+    )
+
+
+@restricted
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin-only snapshot of the queues, caches and upstream latencies."""
+    chat_id = update.effective_chat.id  # type: ignore
+    lines = [
+        f"Updates: {context.application.update_processor.stats!r}",  # type: ignore
+        f"Sends: {context.bot.rate_limiter.stats!r}",  # type: ignore
+        f"Send queue: {context.bot.rate_limiter.queue!r}",  # type: ignore
+        f"Prefetch: {prefetcher.stats!r}",
+        f"Add jobs: {add_jobs.stats!r}",
+        f"Posters: {posters.stats!r}",
+        f"TMDB cache: {tmdb_api.cache.stats!r}",
+        f"TMDB flight: {tmdb_api.cache.flight.stats!r}",
+        f"Radarr flight: {radarr_api.client.flight.stats!r}",
+        f"Pages flight: {pages.stats!r}",
+        f"Library flight: {library.flight.stats!r}",
+    ]
+    lines += [f"Radarr {name}: {s!r}" for name, s in radarr_api.client.stats.items()]
+    for transport in (tmdb_api.client.transport, radarr_api.client.transport):
+        lines.append(f"HTTP: {transport.stats!r}")
+        lines += [f"{host}: {b!r}" for host, b in transport.breakers.items()]
+    await send_message(context.bot, chat_id, "\n".join(lines))
+
+
 @restricted
 async def help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     chat_id = update.effective_chat.id  # type: ignore
@@ -157,6 +235,9 @@ async def help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "- /search <name of the movie>: search for a movie in tmdb \n"
         "- /movie <id of the movie>: search a movie based on ids \n"
         "- /serie <name of the serie>: search for a serie in tmdb \n"
+        "- /add <ids of the movies>: add many movies at once, "
+        "or send a text/csv file with the ids and /add as caption \n"
+        "- /stats: queues, caches and upstream latencies (admin only) \n"
     )
     await send_message(bot, chat_id, help_text)
     help_text = "So if you know the id of the movie, use /movie and id of the movie"
@@ -0,0 +1,233 @@
+"""``/metrics`` endpoint and the collectors that feed it.
+
+The histograms in ``rbot.metrics`` are filled as things happen (handlers,
+TMDB/Radarr requests, Redis commands, Telegram calls). Everything else, cache
+hit ratios, queue depths, breaker states..., already lives in the ``*Stats``
+objects of each component and is read by ``register_collectors`` only when
+Prometheus scrapes, so it costs nothing in between.
+
+``MetricsServer`` is a bare ``asyncio`` HTTP server answering ``GET /metrics``
+in the Prometheus text format, started in ``post_init`` when ``METRICS_PORT`` is set.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterator
+
+from telegram.ext import Application
+
+from rbot.conf import settings
+from rbot.metrics import counter, gauge, registry
+from rbot.prefetch import Prefetcher
+from rbot.radarr import api as radarr_api
+from rbot.radarr.jobs import add_jobs
+from rbot.radarr.library import library
+from rbot.singleflight import SingleFlight
+from rbot.storage.posters import posters
+from rbot.tmdb import api as tmdb_api
+from rbot.transport import CircuitBreaker
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# a scrape that has not sent its request line and headers by then is dropped
+READ_TIMEOUT = 5.0
+TRANSPORT_COUNTERS = {
+    "requests": "Requests sent through the resilient transport",
+    "retries": "Requests sent again after a transient failure",
+    "budget_exhausted": "Retries skipped because the retry budget was spent",
+    "hedges": "Hedged GETs sent because the first one was slow",
+    "hedge_wins": "Hedged GETs that answered first",
+}
+BREAKER_COUNTERS = {
+    "opened": "Times the circuit breaker opened",
+    "rejected": "Requests failed fast while the breaker was open",
+}
+BREAKER_STATES = {
+    CircuitBreaker.CLOSED: 0,
+    CircuitBreaker.HALF_OPEN: 1,
+    CircuitBreaker.OPEN: 2,
+}
+
+
+def register_collectors(
+    application: Application, prefetcher: Prefetcher, pages: SingleFlight
+) -> None:
+    """Export the stats of ``application`` and the module singletons.
+
+    Calling it again, on another ``post_init``, replaces the collectors.
+    """
+
+    @registry.collector
+    def caches() -> Iterator[str]:
+        stats = {"tmdb": tmdb_api.cache.stats, "posters": posters.stats}
+        yield from gauge(
+            "rbot_cache_hit_ratio",
+            "Share of cache lookups answered from the cache",
+            {name: s.hit_ratio for name, s in stats.items()},
+            "cache",
+        )
+        yield from counter(
+            "rbot_cache_misses_total",
+            "Cache lookups that had to go to the backend",
+            {name: s.misses for name, s in stats.items()},
+            "cache",
+        )
+
+    @registry.collector
+    def flights() -> Iterator[str]:
+        stats = {
+            "tmdb": tmdb_api.cache.flight.stats,
+            "radarr": radarr_api.client.flight.stats,
+            "pages": pages.stats,
+            "library": library.flight.stats,
+        }
+        yield from counter(
+            "rbot_singleflight_calls_total",
+            "Calls made through a single-flight group",
+            {name: s.calls for name, s in stats.items()},
+            "flight",
+        )
+        yield from counter(
+            "rbot_singleflight_deduplicated_total",
+            "Calls that joined one already in flight instead of running",
+            {name: s.deduplicated for name, s in stats.items()},
+            "flight",
+        )
+
+    @registry.collector
+    def queues() -> Iterator[str]:
+        stats = {
+            "updates": application.update_processor.stats,  # type: ignore
+            "telegram": application.bot.rate_limiter.queue,  # type: ignore
+        }
+        yield from gauge(
+            "rbot_queue_depth",
+            "Items waiting in a queue",
+            {name: s.pending for name, s in stats.items()},
+            "queue",
+        )
+        yield from gauge(
+            "rbot_queue_wait_seconds_mean",
+            "Mean time items waited in a queue",
+            {name: s.wait.mean for name, s in stats.items()},
+            "queue",
+        )
+        yield from gauge(
+            "rbot_queue_wait_seconds_max",
+            "Longest time an item waited in a queue",
+            {name: s.wait.max for name, s in stats.items()},
+            "queue",
+        )
+
+    @registry.collector
+    def resilience() -> Iterator[str]:
+        transports = (tmdb_api.client.transport, radarr_api.client.transport)
+        for field, help in TRANSPORT_COUNTERS.items():
+            yield from counter(
+                f"rbot_http_{field}_total",
+                help,
+                {t.name: getattr(t.stats, field) for t in transports},
+                "backend",
+            )
+
+        breakers = {
+            host: breaker
+            for transport in transports
+            for host, breaker in transport.breakers.items()
+        }
+        yield from gauge(
+            "rbot_circuit_breaker_state",
+            "0 closed, 1 half open, 2 open",
+            {host: BREAKER_STATES[b.state] for host, b in breakers.items()},
+            "host",
+        )
+        for field, help in BREAKER_COUNTERS.items():
+            yield from counter(
+                f"rbot_circuit_breaker_{field}_total",
+                help,
+                {host: getattr(b.stats, field) for host, b in breakers.items()},
+                "host",
+            )
+
+    @registry.collector
+    def backends() -> Iterator[str]:
+        yield from counter(
+            "rbot_prefetch_total",
+            "What the prefetcher warmed and what came of it",
+            {
+                name: getattr(prefetcher.stats, name)
+                for name in (
+                    "scheduled",
+                    "hits",
+                    "misses",
+                    "wasted",
+                    "cancelled",
+                    "errors",
+                )
+            },
+            "outcome",
+        )
+        yield from counter(
+            "rbot_add_jobs_total",
+            "Radarr add jobs by outcome",
+            {
+                name: getattr(add_jobs.stats, name)
+                for name in ("enqueued", "done", "failed", "retries")
+            },
+            "outcome",
+        )
+        yield from gauge(
+            "rbot_library_titles", "Movies in the Radarr library", {"": len(library)}
+        )
+
+
+class MetricsServer:
+    def __init__(
+        self, host: str = settings.METRICS_HOST, port: int = settings.METRICS_PORT
+    ) -> None:
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info("Serving metrics on %s:%s/metrics", self.host, self.port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            async with asyncio.timeout(READ_TIMEOUT):
+                request = await reader.readuntil(b"\r\n\r\n")
+            method, path, _ = request.split(b"\r\n", 1)[0].decode().split(" ", 2)
+            if method == "GET" and path.split("?", 1)[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b""
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ConnectionError,
+            TimeoutError,
+            ValueError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+
+metrics_server = MetricsServer()
@@ -0,0 +1,122 @@
+"""Speculative warm-up of the result a chat is most likely to ask for next.
+
+After a card is shown the user usually presses "Next" within seconds, so the
+next result is loaded in the background and kept until it is asked for. Each
+chat has at most one prefetch: scheduling a new one cancels the previous one
+and drops its result, which counts as wasted. A semaphore bounds how many
+prefetches run at once across all chats.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+from rbot.conf import settings
+from rbot.metrics import PrefetchStats
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Prefetcher(Generic[T]):
+    def __init__(
+        self,
+        concurrency: int = settings.PREFETCH_CONCURRENCY,
+        ttl: float = settings.PREFETCH_TTL,
+        maxsize: int = settings.PREFETCH_MAX_CHATS,
+    ) -> None:
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stats = PrefetchStats()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._tasks: dict[int, asyncio.Task] = {}
+        # chat id -> (key, expires at, value)
+        self._ready: OrderedDict[int, tuple[Hashable, float, T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def schedule(
+        self,
+        chat_id: int,
+        key: Hashable,
+        warm: Callable[..., Awaitable[T | None]],
+        *args: Any,
+    ) -> None:
+        """Run ``warm(*args)`` in the background and keep its result for ``take``."""
+        if self.concurrency <= 0:
+            return
+        self.cancel(chat_id)
+        self.stats.scheduled += 1
+        task = asyncio.create_task(self._run(chat_id, key, warm, *args))
+        self._tasks[chat_id] = task
+        task.add_done_callback(lambda _: self._forget(chat_id, task))
+
+    def _forget(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._tasks.get(chat_id) is task:
+            del self._tasks[chat_id]
+
+    async def _run(
+        self,
+        chat_id: int,
+        key: Hashable,
+        warm: Callable[..., Awaitable[T | None]],
+        *args: Any,
+    ) -> None:
+        try:
+            async with self.semaphore:
+                value = await warm(*args)
+        except Exception:
+            self.stats.errors += 1
+            log.exception("Prefetch %s failed", key)
+            return
+        if value is None:
+            return
+        self._ready[chat_id] = (key, time.monotonic() + self.ttl, value)
+        self._ready.move_to_end(chat_id)
+        while len(self._ready) > self.maxsize:
+            self._ready.popitem(last=False)
+            self.stats.wasted += 1
+
+    def cancel(self, chat_id: int) -> None:
+        """Drop whatever was prefetched or is being prefetched for ``chat_id``."""
+        task = self._tasks.pop(chat_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+            self.stats.cancelled += 1
+        if self._ready.pop(chat_id, None) is not None:
+            self.stats.wasted += 1
+
+    def take(self, chat_id: int, key: Hashable) -> T | None:
+        """The prefetched value for ``key``, if it is ready and still fresh."""
+        entry = self._ready.get(chat_id)
+        if entry is None or entry[0] != key:
+            self.stats.misses += 1
+            return None
+        del self._ready[chat_id]
+        _, expires_at, value = entry
+        if expires_at < time.monotonic():
+            self.stats.wasted += 1
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return value
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._ready.clear()
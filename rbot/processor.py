@@ -0,0 +1,87 @@
+"""Concurrent update processing that keeps each chat's updates in order.
+
+Updates of different chats run concurrently on up to ``UPDATE_WORKERS``
+workers, so a slow Radarr add in one chat no longer holds back a ``/search``
+in another. Updates of the same chat go through a per-chat lock and run one at
+a time in arrival order, so a "Next" can never overtake the search it pages.
+
+A worker is only taken once the chat's turn has come: updates queued behind
+their own chat do not hold workers other chats could use. At most
+``UPDATE_MAX_PENDING`` updates are accepted in total, waiting or running.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from rbot.conf import settings
+from rbot.metrics import QueueStats
+
+log = logging.getLogger(__name__)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    __slots__ = ("workers", "stats", "_workers", "_locks", "_waiting")
+
+    def __init__(
+        self,
+        workers: int = settings.UPDATE_WORKERS,
+        max_pending: int = settings.UPDATE_MAX_PENDING,
+    ) -> None:
+        if workers < 1:
+            # a semaphore of 0 would leave every update waiting for a worker
+            raise ValueError("workers must be a positive integer")
+        super().__init__(max(workers, max_pending))
+        self.workers = workers
+        self.stats = QueueStats()
+        self._workers = asyncio.BoundedSemaphore(workers)
+        self._locks: dict[int, asyncio.Lock] = {}
+        # updates holding or waiting for each chat lock, to drop idle locks
+        self._waiting: dict[int, int] = {}
+
+    @asynccontextmanager
+    async def chat_turn(self, chat_id: int | None) -> AsyncIterator[None]:
+        """Wait until the updates of ``chat_id`` received earlier are done."""
+        if chat_id is None:
+            yield
+            return
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        self._waiting[chat_id] = self._waiting.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiting[chat_id] -= 1
+            if not self._waiting[chat_id]:
+                del self._waiting[chat_id]
+                del self._locks[chat_id]
+
+    async def do_process_update(
+        self, update: object, coroutine: Awaitable[Any]
+    ) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        queued_at = time.perf_counter()
+        self.stats.enqueue()
+        started = False
+        try:
+            async with self.chat_turn(chat.id if chat else None), self._workers:
+                self.stats.start(time.perf_counter() - queued_at)
+                started = True
+                await coroutine
+        finally:
+            if started:
+                self.stats.running -= 1
+            else:
+                self.stats.pending -= 1
+
+    async def initialize(self) -> None:
+        log.info("Processing updates on %s workers", self.workers)
+
+    async def shutdown(self) -> None:
+        log.info("Update queue at shutdown: %r", self.stats)
@@ -1,27 +1,116 @@
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
 import httpx
 
 from rbot.conf import settings
+from rbot.metrics import latency_stats, measure
+from rbot.radarr.stream import iter_json_array
+from rbot.singleflight import SingleFlight
 from rbot.storage.models import (
     Movie,
     Serie,
     process_movie_search_results,
     process_serie_search_results,
 )
+from rbot.transport import ResilientTransport
 
 log = logging.getLogger(__name__)
 
 headers = {"Content-Type": "application/json", "X-Api-Key": settings.RADARR_API_KEY}
 
 
-async def movie_loookup(tmdb_id: str) -> dict[str, Any]:
-    url = f"{settings.RADARR_BASE_URL}movie/lookup/tmdb?tmdbId={tmdb_id}"
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers)
+class RadarrClient:
+    """Long-lived Radarr client sharing one pool of keep-alive connections.
+
+    Every request is timed and recorded in ``stats`` under its endpoint name,
+    so ``client.stats["movie/lookup/tmdb"]`` shows how Radarr is doing.
+    Identical concurrent GETs are coalesced through ``flight``, and every
+    request goes through ``transport`` (retries and a circuit breaker, so a
+    restarting Radarr fails fast instead of piling up waiting handlers).
+    """
+
+    def __init__(self, base_url: str = settings.RADARR_BASE_URL) -> None:
+        self.base_url = base_url
+        self.stats = latency_stats()
+        self.flight = SingleFlight()
+        self.transport = ResilientTransport(
+            httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=settings.RADARR_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RADARR_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+            name="radarr",
+        )
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(
+                    settings.RADARR_TIMEOUT, connect=settings.RADARR_CONNECT_TIMEOUT
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def start(self) -> None:
+        log.info("Starting Radarr client")
+        self.client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            log.info("Closing Radarr client")
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self, method: str, endpoint: str, **kwargs: Any
+    ) -> httpx.Response:
+        with measure(self.stats, endpoint):
+            response = await self.client.request(method, endpoint, **kwargs)
             response.raise_for_status()
+        return response
+
+    async def get(self, endpoint: str, **params: Any) -> httpx.Response:
+        key = (endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+        return await self.flight.do(key, self._get, endpoint, params)
+
+    async def _get(self, endpoint: str, params: dict[str, Any]) -> httpx.Response:
+        return await self.request("GET", endpoint, params=params)
+
+    @asynccontextmanager
+    async def stream_movie_collection(
+        self, etag: str | None = None, last_modified: str | None = None
+    ) -> AsyncIterator[httpx.Response]:
+        """Conditional, streamed GET of the whole ``/movie`` collection.
+
+        Yields the response with its body still unread, a 304 without body
+        when Radarr says the collection did not change since
+        ``etag``/``last_modified``.
+        """
+        conditions = {}
+        if etag:
+            conditions["If-None-Match"] = etag
+        if last_modified:
+            conditions["If-Modified-Since"] = last_modified
+        with measure(self.stats, "movie"):
+            async with self.client.stream(
+                "GET", "movie", headers=conditions
+            ) as response:
+                if response.status_code != httpx.codes.NOT_MODIFIED:
+                    response.raise_for_status()
+                yield response
+
+    async def movie_loookup(self, tmdb_id: str) -> dict[str, Any]:
+        try:
+            response = await self.get("movie/lookup/tmdb", tmdbId=tmdb_id)
         except Exception as e:
             log.exception(e)
             raise Exception("Could not get movies from Radarr") from e
@@ -34,16 +123,10 @@ async def movie_loookup(tmdb_id: str) -> dict[str, Any]:
                 f"Could parse response from Radarr. Response: {response}"
             ) from e
 
-
-async def add_movie_to_radarr(tmdb_id: str) -> str:
-    try:
-        movie_json = await movie_loookup(tmdb_id)
+    async def add_movie(self, tmdb_id: str) -> None:
+        """Look the movie up and add it, raising if either step fails."""
+        movie_json = await self.movie_loookup(tmdb_id)
         movie_title = f"{movie_json['title'].strip()} ({movie_json['year']})"
-    except Exception:
-        log.exception("Could not get movie from TMDB")
-        return "Movie has not been added!"
-
-    try:
         payload = {
             "title": movie_json["title"],
             "tmdbId": tmdb_id,
@@ -52,23 +135,20 @@ async def add_movie_to_radarr(tmdb_id: str) -> str:
             "folder": movie_title,
             "monitored": True,
         }
-        url = f"{settings.RADARR_BASE_URL}movie"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return "Movie has been added!"
-    except Exception as e:
-        log.exception(e)
+        await self.request("POST", "movie", json=payload)
 
-    return "Movie has not been added!"
+    async def add_movie_to_radarr(self, tmdb_id: str) -> str:
+        try:
+            await self.add_movie(tmdb_id)
+            return "Movie has been added!"
+        except Exception as e:
+            log.exception(e)
 
+        return "Movie has not been added!"
 
-async def get_movies_from_radarr() -> list[Movie]:
-    url = f"{settings.RADARR_BASE_URL}movie"
-    async with httpx.AsyncClient() as client:
+    async def get_movies_from_radarr(self) -> list[Movie]:
         try:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
+            response = await self.get("movie")
         except Exception as e:
             log.exception(e)
             raise Exception("Could not get movies from Radarr") from e
@@ -80,30 +160,43 @@ async def get_movies_from_radarr() -> list[Movie]:
             log.exception(e)
             raise Exception("Could not parse response from Radarr") from e
 
-
-async def serie_lookup(tmdb_id: str) -> dict[str, Any]:
-    url = f"{settings.RADARR_BASE_URL}series/lookup?term={tmdb_id}"
-    log.info(url)
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
+    async def iter_collection(
+        self, endpoint: str, model: type[Movie] | type[Serie]
+    ) -> AsyncIterator[Movie | Serie]:
+        """Stream a collection endpoint, yielding one validated model at a time.
+
+        Unlike ``get_movies_from_radarr`` the body is never held whole in memory,
+        so memory stays flat no matter how big the library is.
+        """
+        with measure(self.stats, endpoint):
+            async with self.client.stream("GET", endpoint) as response:
+                response.raise_for_status()
+                async for item in iter_json_array(response.aiter_bytes()):
+                    try:
+                        yield model(**item)
+                    except ValueError as e:
+                        log.error("Not valid %s... skipping it: %s", endpoint, e)
+
+    def iter_movies_from_radarr(self) -> AsyncIterator[Movie]:
+        return self.iter_collection("movie", Movie)  # type: ignore
+
+    def iter_series_from_radarr(self) -> AsyncIterator[Serie]:
+        return self.iter_collection("series", Serie)  # type: ignore
+
+    async def serie_lookup(self, tmdb_id: str) -> dict[str, Any]:
+        log.info("Looking up serie %s", tmdb_id)
+        try:
+            response = await self.get("series/lookup", term=tmdb_id)
             serie_json = response.json()
             return serie_json
-    except Exception as e:
-        log.exception(e)
-        raise Exception("Could not get series from Radarr") from e
-
+        except Exception as e:
+            log.exception(e)
+            raise Exception("Could not get series from Radarr") from e
 
-async def add_serie_to_radarr(tmdb_id: str) -> str:
-    try:
-        serie_json = await serie_lookup(tmdb_id)
+    async def add_serie(self, tmdb_id: str) -> None:
+        """Look the serie up and add it, raising if either step fails."""
+        serie_json = await self.serie_lookup(tmdb_id)
         serie_title = f"{serie_json['title'].strip()} ({serie_json['year']})"
-    except Exception:
-        log.exception("Could not get serie from TMDB")
-        return "Serie has not been added!"
-
-    try:
         payload = {
             "title": serie_json["title"],
             "tmdbId": tmdb_id,
@@ -112,26 +205,35 @@ async def add_serie_to_radarr(tmdb_id: str) -> str:
             "folder": serie_title,
             "monitored": True,
         }
-        url = f"{settings.RADARR_BASE_URL}series"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return "Serie has been added!"
-    except Exception as e:
-        log.exception(e)
+        await self.request("POST", "series", json=payload)
 
-    return "Serie has not been added!"
+    async def add_serie_to_radarr(self, tmdb_id: str) -> str:
+        try:
+            await self.add_serie(tmdb_id)
+            return "Serie has been added!"
+        except Exception as e:
+            log.exception(e)
 
+        return "Serie has not been added!"
 
-async def get_series_from_radarr() -> list[Serie]:
-    url = f"{settings.RADARR_BASE_URL}series"
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
+    async def get_series_from_radarr(self) -> list[Serie]:
+        try:
+            response = await self.get("series")
             data = response.json()
             series = await process_serie_search_results(data)
             return series
-    except Exception as e:
-        log.exception(e)
-        raise Exception("Could not get series from Radarr") from e
+        except Exception as e:
+            log.exception(e)
+            raise Exception("Could not get series from Radarr") from e
+
+
+client = RadarrClient()
+
+movie_loookup = client.movie_loookup
+add_movie_to_radarr = client.add_movie_to_radarr
+get_movies_from_radarr = client.get_movies_from_radarr
+iter_movies_from_radarr = client.iter_movies_from_radarr
+serie_lookup = client.serie_lookup
+add_serie_to_radarr = client.add_serie_to_radarr
+get_series_from_radarr = client.get_series_from_radarr
+iter_series_from_radarr = client.iter_series_from_radarr
@@ -0,0 +1,144 @@
+"""Bulk import of many TMDB ids into Radarr.
+
+``parse_ids`` reads ids from a command line, a text file or a CSV export, and
+``bulk_add`` streams them through ``BULK_ADD_CONCURRENCY`` workers that share
+one iterator, so a list of thousands of ids never turns into thousands of
+pending tasks or requests against Radarr. Titles already in the library are
+skipped without a request, titles an add job already holds are left to it, and
+transient Radarr failures are retried with the add jobs' backoff (see
+``rbot.radarr.jobs``). Progress is reported at most once every
+``BULK_ADD_PROGRESS_INTERVAL`` seconds and once more at the end.
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import re
+from collections.abc import Awaitable, Callable, Container, Iterable
+
+from redis.exceptions import RedisError
+
+from rbot.conf import settings
+from rbot.radarr.api import client as radarr_client
+from rbot.radarr.jobs import AddJobQueue, add_jobs, is_retryable
+from rbot.radarr.library import library as radarr_library
+
+log = logging.getLogger(__name__)
+
+ID_COLUMNS = ("tmdbid", "tmdb_id", "tmdb", "id")
+
+
+def parse_ids(text: str) -> list[str]:
+    """TMDB ids in ``text``, in order and without repeats.
+
+    A CSV with a header takes its ``tmdbId``/``tmdb_id``/``tmdb``/``id`` column,
+    anything else is split on whitespace, commas and semicolons.
+    """
+    lines = text.strip().splitlines()
+    header = [cell.strip().lower() for cell in lines[0].split(",")] if lines else []
+    column = next((name for name in ID_COLUMNS if name in header), None)
+    if column is not None:
+        rows = csv.reader(io.StringIO(text.strip()))
+        next(rows)
+        index = header.index(column)
+        tokens: Iterable[str] = (row[index] for row in rows if len(row) > index)
+    else:
+        tokens = re.split(r"[\s,;]+", text)
+    ids = (token.strip() for token in tokens)
+    return list(dict.fromkeys(token for token in ids if token.isdigit()))
+
+
+class BulkProgress:
+    __slots__ = ("total", "added", "skipped", "queued", "failed")
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.added = 0
+        self.skipped = 0
+        self.queued = 0
+        self.failed = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Adding {self.total} movies: {self.done}/{self.total} done\n"
+            f"Added: {self.added}\n"
+            f"Already in the library: {self.skipped}\n"
+            f"Already being added: {self.queued}\n"
+            f"Failed: {self.failed}"
+        )
+
+    @property
+    def done(self) -> int:
+        return self.added + self.skipped + self.queued + self.failed
+
+
+async def reserve(jobs: AddJobQueue, tmdb_id: str) -> bool:
+    try:
+        return await jobs.reserve("movie", tmdb_id)
+    except RedisError:
+        # without Redis there is no add job to race with
+        log.warning("Could not reserve movie %s", tmdb_id, exc_info=True)
+        return True
+
+
+async def add_one(
+    add: Callable[[str], Awaitable[None]], tmdb_id: str, jobs: AddJobQueue
+) -> bool:
+    for attempt in range(1, jobs.max_attempts + 1):
+        try:
+            await add(tmdb_id)
+            return True
+        except Exception as e:
+            if attempt == jobs.max_attempts or not is_retryable(e):
+                log.warning("Could not add movie %s: %s", tmdb_id, e)
+                return False
+            await asyncio.sleep(jobs.delay(attempt))
+    return False
+
+
+async def bulk_add(
+    ids: list[str],
+    report: Callable[[BulkProgress], Awaitable[None]],
+    concurrency: int = settings.BULK_ADD_CONCURRENCY,
+    interval: float = settings.BULK_ADD_PROGRESS_INTERVAL,
+    library: Container[str] = radarr_library,
+    add: Callable[[str], Awaitable[None]] = radarr_client.add_movie,
+    jobs: AddJobQueue = add_jobs,
+) -> BulkProgress:
+    progress = BulkProgress(len(ids))
+    pending = iter(ids)
+
+    async def worker() -> None:
+        for tmdb_id in pending:
+            if tmdb_id in library:
+                progress.skipped += 1
+                continue
+            if not await reserve(jobs, tmdb_id):
+                progress.queued += 1
+                continue
+            try:
+                added = await add_one(add, tmdb_id, jobs)
+            finally:
+                await jobs.release("movie", tmdb_id)
+            if added:
+                progress.added += 1
+            else:
+                progress.failed += 1
+
+    async def reporter() -> None:
+        reported = 0
+        while True:
+            await asyncio.sleep(interval)
+            if progress.done != reported:
+                reported = progress.done
+                await report(progress)
+
+    reporting = asyncio.create_task(reporter())
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        reporting.cancel()
+        await asyncio.gather(reporting, return_exceptions=True)
+    await report(progress)
+    return progress
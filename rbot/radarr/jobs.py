@@ -0,0 +1,261 @@
+"""Background queue of "Confirm" adds, backed by a Redis stream.
+
+Adding a title means a lookup and a POST to Radarr, which can take seconds on
+a busy NAS. ``callback`` only reserves the title and queues a job, and a pool
+of ``ADD_JOB_WORKERS`` workers reads the stream through a consumer group,
+runs the add and edits the confirmation message with the outcome.
+
+- Idempotency: a title (kind and tmdbId) is reserved while its job is queued
+  or running, so double taps and repeated confirms queue one job. The job
+  releases it once it is done, whatever the outcome, and ``ADD_JOB_DEDUP_TTL``
+  only bounds how long a reservation outlives a job that never finished.
+- Retries: Radarr being unreachable, timing out or answering 429/5xx is
+  retried with jittered exponential backoff, up to ``ADD_JOB_MAX_ATTEMPTS``.
+- Persistence: a job is only acknowledged once it is done. Jobs left pending
+  by a worker that died are claimed again by the running workers, which look
+  for them every ``RECLAIM_INTERVAL``.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+from redis.exceptions import RedisError, ResponseError
+from telegram import Bot, error
+
+from rbot.conf import settings
+from rbot.metrics import JobStats
+from rbot.radarr.api import client as radarr_client
+from rbot.storage.redis import pool
+
+log = logging.getLogger(__name__)
+
+Adder = Callable[[str], Awaitable[None]]
+
+# how long a block read waits for new jobs, below the Redis socket timeout
+BLOCK_MS = 2000
+# jobs pending this long belong to a worker that is gone: longer than a live
+# worker can spend on one job, retries and backoff included
+CLAIM_IDLE_MS = 10 * 60 * 1000
+# how often each worker looks for such jobs, in seconds
+RECLAIM_INTERVAL = 60
+
+
+def is_retryable(exc: BaseException | None) -> bool:
+    """Whether ``exc`` (or what caused it) is a failure worth trying again."""
+    while exc is not None:
+        if isinstance(exc, httpx.TransportError):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            status = exc.response.status_code
+            return status == httpx.codes.TOO_MANY_REQUESTS or status >= 500
+        exc = exc.__cause__
+    return False
+
+
+class AddJobQueue:
+    def __init__(
+        self,
+        workers: int = settings.ADD_JOB_WORKERS,
+        max_attempts: int = settings.ADD_JOB_MAX_ATTEMPTS,
+        backoff: float = settings.ADD_JOB_BACKOFF,
+        max_backoff: float = settings.ADD_JOB_MAX_BACKOFF,
+        key: str = "rbot:jobs:add",
+        adders: dict[str, Adder] | None = None,
+    ) -> None:
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stream = key
+        self.group = "rbot"
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.adders = adders or {
+            "movie": radarr_client.add_movie,
+            "serie": radarr_client.add_serie,
+        }
+        self.stats = JobStats()
+        self._bot: Bot | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def dedup_key(self, kind: str, tmdb_id: str) -> str:
+        return f"{self.stream}:{kind}:{tmdb_id}"
+
+    async def reserve(self, kind: str, tmdb_id: str) -> bool:
+        """Claim ``tmdb_id``, False if it was already queued recently."""
+        key = self.dedup_key(kind, tmdb_id)
+        reserved = await pool.client.set(key, 1, nx=True, ex=settings.ADD_JOB_DEDUP_TTL)
+        if not reserved:
+            self.stats.duplicates += 1
+        return bool(reserved)
+
+    async def push(
+        self, kind: str, tmdb_id: str, chat_id: int, message_id: int, caption: bool
+    ) -> None:
+        """Queue a job for a title ``reserve`` claimed.
+
+        ``chat_id``/``message_id`` is the message to edit with the outcome,
+        through its caption if ``caption`` is set or its text otherwise.
+        """
+        job = {
+            "kind": kind,
+            "tmdb_id": tmdb_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "caption": int(caption),
+        }
+        try:
+            await pool.client.xadd(self.stream, job)  # type: ignore
+        except Exception:
+            await self.release(kind, tmdb_id)
+            raise
+        self.stats.enqueued += 1
+
+    async def release(self, kind: str, tmdb_id: str) -> None:
+        """Let ``tmdb_id`` be queued again, left to its TTL if Redis is down."""
+        try:
+            await pool.client.delete(self.dedup_key(kind, tmdb_id))
+        except RedisError:
+            log.warning("Could not release %s %s", kind, tmdb_id, exc_info=True)
+
+    async def start(self, bot: Bot) -> None:
+        if self.workers <= 0:
+            return
+        self._bot = bot
+        try:
+            await pool.client.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        log.info("Starting %s add job workers", self.workers)
+        self._tasks = [
+            asyncio.create_task(self.work(f"{self.consumer}-{n}"))
+            for n in range(self.workers)
+        ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def reclaim(self, consumer: str) -> list[Any]:
+        """Take over the jobs a worker that is gone left unfinished."""
+        response = await pool.client.xautoclaim(
+            self.stream, self.group, consumer, min_idle_time=CLAIM_IDLE_MS
+        )
+        claimed = response[1]
+        if claimed:
+            self.stats.reclaimed += len(claimed)
+            log.info("Reclaimed %s unfinished add jobs", len(claimed))
+        return claimed
+
+    async def work(self, consumer: str) -> None:
+        # first the jobs already assigned to this consumer, then new ones
+        last_id = "0"
+        reclaim_at = 0.0
+        while True:
+            try:
+                entries = []
+                if time.monotonic() >= reclaim_at:
+                    reclaim_at = time.monotonic() + RECLAIM_INTERVAL
+                    entries = await self.reclaim(consumer)
+                if not entries:
+                    response = await pool.client.xreadgroup(
+                        self.group,
+                        consumer,
+                        {self.stream: last_id},
+                        count=1,
+                        block=None if last_id == "0" else BLOCK_MS,
+                    )
+                    entries = response[0][1] if response else []
+                    if not entries and last_id == "0":
+                        last_id = ">"
+            except Exception:
+                log.exception("Could not read add jobs")
+                await asyncio.sleep(1)
+                continue
+
+            for entry_id, fields in entries:
+                if not await self.handle(entry_id, fields):
+                    # left pending: read it again with this consumer's backlog
+                    last_id = "0"
+                    await asyncio.sleep(1)
+                    break
+
+    async def handle(self, entry_id: bytes, fields: dict[bytes, bytes]) -> bool:
+        """Process and acknowledge one entry, False if that could not finish."""
+        job = {key.decode(): value.decode() for key, value in fields.items()}
+        try:
+            added = await self.process(job)
+            async with pool.client.pipeline(transaction=True) as pipe:
+                pipe.xack(self.stream, self.group, entry_id)
+                pipe.xdel(self.stream, entry_id)
+                await pipe.execute()
+        except Exception:
+            log.exception("Could not finish add job %s", entry_id)
+            return False
+        if added:
+            self.stats.done += 1
+        else:
+            self.stats.failed += 1
+        return True
+
+    async def process(self, job: dict[str, Any]) -> bool:
+        """Run one add job, retrying transient failures, and report it."""
+        kind, tmdb_id = job["kind"], job["tmdb_id"]
+        label = kind.capitalize()
+        added = False
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.adders[kind](tmdb_id)
+            except Exception as e:
+                if attempt < self.max_attempts and is_retryable(e):
+                    delay = self.delay(attempt)
+                    self.stats.retries += 1
+                    log.warning(
+                        "Adding %s %s failed, retry in %.1fs", kind, tmdb_id, delay
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                log.exception("Could not add %s %s", kind, tmdb_id)
+            else:
+                added = True
+            break
+
+        await self.release(kind, tmdb_id)
+
+        outcome = "has been added!" if added else "has not been added!"
+        await self.notify(job, f"{label} {outcome}")
+        return added
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    async def notify(self, job: dict[str, Any], text: str) -> None:
+        if self._bot is None:
+            return
+        chat_id, message_id = int(job["chat_id"]), int(job["message_id"])
+        try:
+            if int(job["caption"]):
+                await self._bot.edit_message_caption(
+                    chat_id=chat_id, message_id=message_id, caption=text
+                )
+            else:
+                await self._bot.edit_message_text(
+                    text, chat_id=chat_id, message_id=message_id
+                )
+        except error.TelegramError:
+            log.exception("Could not report add job outcome to %s", chat_id)
+
+
+add_jobs = AddJobQueue()
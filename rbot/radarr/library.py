@@ -0,0 +1,165 @@
+"""Local, versioned copy of the Radarr movie library, keyed by tmdbId.
+
+``Library.sync`` streams ``/movie`` (conditionally, with the ETag and
+Last-Modified of the previous response when Radarr sends them), diffs it
+movie by movie against the last snapshot by Radarr id and only validates the
+movies that were added or changed, so the whole listing is never in memory. It
+runs once in ``post_init`` and then as a repeating job, so handlers can tell
+whether a title is owned without any network call. Movies are kept as compact
+``TitleRecord``s rather than full models.
+"""
+
+import logging
+import time
+from collections import Counter
+from collections.abc import AsyncIterable, Iterable
+from typing import Any
+
+from telegram.ext import ContextTypes
+
+from rbot.radarr import api as radarr_api
+from rbot.radarr.stream import iter_json_array
+from rbot.singleflight import SingleFlight
+from rbot.storage.models import Movie
+from rbot.storage.records import TitleRecord
+
+log = logging.getLogger(__name__)
+
+FINGERPRINT_FIELDS = (*Movie.model_fields, "hasFile", "monitored")
+
+
+def fingerprint(item: dict[str, Any]) -> int:
+    return hash(repr(tuple(item.get(field) for field in FINGERPRINT_FIELDS)))
+
+
+class Library:
+    def __init__(self) -> None:
+        self.version = 0
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.synced_at: float | None = None
+        self._fingerprints: dict[int, int] = {}
+        self._tmdb_ids: dict[int, int] = {}
+        self._by_tmdb_id: dict[int, TitleRecord] = {}
+        self.flight = SingleFlight()
+
+    def __contains__(self, tmdb_id: object) -> bool:
+        try:
+            return int(tmdb_id) in self._by_tmdb_id  # type: ignore
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self) -> int:
+        return len(self._by_tmdb_id)
+
+    def get(self, tmdb_id: int | str) -> TitleRecord | None:
+        try:
+            return self._by_tmdb_id.get(int(tmdb_id))
+        except (TypeError, ValueError):
+            return None
+
+    def movies(self) -> list[Movie]:
+        return [record.to_model() for record in self._by_tmdb_id.values()]  # type: ignore
+
+    def _drop(self, radarr_id: int) -> None:
+        tmdb_id = self._tmdb_ids.pop(radarr_id, None)
+        if tmdb_id is not None:
+            self._by_tmdb_id.pop(tmdb_id, None)
+
+    def apply(self, items: Iterable[dict[str, Any]]) -> tuple[int, int, int]:
+        """Apply a full ``/movie`` listing, returning (added, updated, removed)."""
+        seen: set[int] = set()
+        changes: Counter[str | None] = Counter()
+        for item in items:
+            changes[self._update(item, seen)] += 1
+        return self._remove_unseen(seen, changes)
+
+    async def apply_stream(
+        self, items: AsyncIterable[dict[str, Any]]
+    ) -> tuple[int, int, int]:
+        """``apply`` over a listing parsed as it is downloaded."""
+        seen: set[int] = set()
+        changes: Counter[str | None] = Counter()
+        async for item in items:
+            changes[self._update(item, seen)] += 1
+        return self._remove_unseen(seen, changes)
+
+    def _update(self, item: dict[str, Any], seen: set[int]) -> str | None:
+        """Record one listed movie, returning "added"/"updated" if it changed."""
+        radarr_id = item.get("id")
+        if radarr_id is None:
+            return None
+        seen.add(radarr_id)
+
+        item_fingerprint = fingerprint(item)
+        previous = self._fingerprints.get(radarr_id)
+        if previous == item_fingerprint:
+            return None
+        self._fingerprints[radarr_id] = item_fingerprint
+        if previous is not None:
+            self._drop(radarr_id)
+
+        try:
+            movie = Movie(**item)
+        except ValueError as e:
+            log.error("Not valid movie... skipping it: %s", e)
+        else:
+            if movie.tmdbId:
+                self._by_tmdb_id[movie.tmdbId] = TitleRecord.from_model(movie)
+                self._tmdb_ids[radarr_id] = movie.tmdbId
+        return "added" if previous is None else "updated"
+
+    def _remove_unseen(
+        self, seen: set[int], changes: Counter[str | None]
+    ) -> tuple[int, int, int]:
+        added, updated = changes["added"], changes["updated"]
+        removed = self._fingerprints.keys() - seen
+        for radarr_id in removed:
+            del self._fingerprints[radarr_id]
+            self._drop(radarr_id)
+
+        if added or updated or removed:
+            self.version += 1
+        return added, updated, len(removed)
+
+    async def sync(self) -> None:
+        """Bring the copy up to date, sharing a sync that is already running.
+
+        Two listings applied at once would each remove what the other one has
+        not seen yet, so the repeating job, ``post_init`` and prefetches waiting
+        on the library all join the same sync.
+        """
+        await self.flight.do("sync", self._sync)
+
+    async def _sync(self) -> None:
+        async with radarr_api.client.stream_movie_collection(
+            etag=self.etag, last_modified=self.last_modified
+        ) as response:
+            if response.status_code == 304:
+                self.synced_at = time.monotonic()
+                log.debug("Radarr library not modified (version %s)", self.version)
+                return
+
+            items = iter_json_array(response.aiter_bytes())
+            added, updated, removed = await self.apply_stream(items)
+            # only once the whole listing was applied
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            self.synced_at = time.monotonic()
+        log.info(
+            "Radarr library synced to version %s: %s added, %s updated, %s removed",
+            self.version,
+            added,
+            updated,
+            removed,
+        )
+
+
+library = Library()
+
+
+async def sync_library(context: ContextTypes.DEFAULT_TYPE) -> None:
+    try:
+        await library.sync()
+    except Exception:
+        log.exception("Could not sync the Radarr library")
@@ -0,0 +1,55 @@
+"""Incremental parsing of large JSON array responses.
+
+Radarr returns its collections as one big JSON array. ``iter_json_array`` walks
+the response body chunk by chunk and yields each array element as soon as it
+is complete, so only one element (plus the current chunk) is held at a time.
+"""
+
+import codecs
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+WHITESPACE = " \t\n\r"
+
+decoder = json.JSONDecoder()
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = finished = False
+
+    async for chunk in chunks:
+        buffer += text.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Response is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ",":
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                break
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+            if end == len(buffer):
+                break  # a number could still continue in the next chunk
+            yield element
+            pos = end
+        buffer = buffer[pos:]
+        if finished:
+            return
+
+    raise ValueError("Truncated JSON array")
@@ -0,0 +1,279 @@
+"""Scheduler for the requests the bot sends to Telegram.
+
+Telegram allows about 30 messages per second overall, one per second in a
+private chat and 20 per minute in a group, and answers ``RetryAfter`` beyond
+that. ``SendScheduler`` is plugged into the ``Application`` as its rate
+limiter, so every ``bot.send_*``/``edit_*`` call goes through it:
+
+- Each message takes a token from a global bucket and from its chat's bucket.
+  When either is empty the request waits in a queue ordered by priority
+  (lower first, ``PRIORITIES`` or ``rate_limit_args``) and arrival, and a
+  chat waiting for its own bucket never holds back other chats.
+- "typing" actions are coalesced: Telegram shows one for five seconds, so
+  another one for the same chat within that time is answered locally. Chat
+  actions are not messages and take no token from the chat's bucket, so they
+  never delay the message they announce.
+- A ``RetryAfter`` pauses the chat (or everything, if the request had no chat)
+  for the time Telegram asked and the request is sent again.
+
+Other requests (``getUpdates``, ``answerCallbackQuery``, ``getFile``...) are
+not limited. ``stats``/``queue`` report what was sent and how long it waited.
+"""
+
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from collections.abc import Callable, Coroutine
+from datetime import timedelta
+from typing import Any
+
+from telegram.constants import ChatAction
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from rbot.conf import settings
+from rbot.metrics import QueueStats, SendStats, span, telegram_latency
+
+log = logging.getLogger(__name__)
+
+# a typing action shows for 5 seconds, unless a message arrives first
+TYPING_COALESCE = 4.5
+
+Result = bool | dict[str, Any] | list[dict[str, Any]]
+Callback = Callable[..., Coroutine[Any, Any, Result]]
+
+PRIORITIES = {
+    # answers to a button press first, then new messages, then decoration
+    "editMessageText": 0,
+    "editMessageCaption": 0,
+    "editMessageMedia": 0,
+    "editMessageReplyMarkup": 0,
+    "sendChatAction": 2,
+}
+DEFAULT_PRIORITY = 1
+
+
+def is_limited(endpoint: str) -> bool:
+    return endpoint.startswith(("send", "edit", "copy", "forward"))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until ``cost`` tokens can be taken, 0 if they can be now."""
+        self.refill(now)
+        wait = max(0.0, self.paused_until - now)
+        missing = min(cost, self.capacity) - self.tokens
+        if missing > 0:
+            wait = max(wait, missing / self.rate)
+        return wait
+
+    def take(self, cost: float) -> None:
+        self.tokens -= min(cost, self.capacity)
+
+    @property
+    def idle(self) -> bool:
+        return self.tokens >= self.capacity and self.paused_until < time.monotonic()
+
+
+class SendScheduler(BaseRateLimiter[int]):
+    def __init__(
+        self,
+        global_rate: float = settings.TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = settings.TELEGRAM_CHAT_RATE,
+        group_rate: float = settings.TELEGRAM_GROUP_RATE,
+        chat_burst: int = settings.TELEGRAM_CHAT_BURST,
+        max_retries: int = settings.TELEGRAM_MAX_RETRIES,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.stats = SendStats()
+        self.queue = QueueStats()
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chats: dict[int | str, TokenBucket] = {}
+        self._typing: dict[int | str, float] = {}
+        # (priority, arrival, chat id, cost, chat cost, queued at, future),
+        # in send order
+        self._waiting: list[
+            tuple[int, int, Any, float, float, float, asyncio.Future]
+        ] = []
+        self._arrivals = itertools.count()
+        self._wake = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+
+    async def initialize(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self.dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        log.info("Telegram sends: %r, %r", self.stats, self.queue)
+
+    def bucket(self, chat_id: int | str | None) -> TokenBucket:
+        if chat_id is None:
+            return self.global_bucket
+        if chat_id not in self._chats:
+            if len(self._chats) > 1000:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle}
+            group = str(chat_id).startswith("-")
+            rate = self.group_rate if group else self.chat_rate
+            self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return self._chats[chat_id]
+
+    async def process_request(
+        self,
+        callback: Callback,
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: int | None,
+    ) -> Result:
+        with span(telegram_latency.labels(endpoint)):
+            return await self.schedule(
+                callback, args, kwargs, endpoint, data, rate_limit_args
+            )
+
+    async def schedule(
+        self,
+        callback: Callback,
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: int | None,
+    ) -> Result:
+        if not is_limited(endpoint):
+            return await callback(*args, **kwargs)
+
+        chat_id = data.get("chat_id")
+        now = time.monotonic()
+        if endpoint == "sendChatAction" and data.get("action") == ChatAction.TYPING:
+            if now - self._typing.get(chat_id, float("-inf")) < TYPING_COALESCE:  # type: ignore
+                self.stats.coalesced += 1
+                return True
+            self._typing[chat_id] = now  # type: ignore
+        elif endpoint.startswith("send"):
+            # a new message ends the typing indicator
+            self._typing.pop(chat_id, None)  # type: ignore
+
+        priority = rate_limit_args
+        if priority is None:
+            priority = PRIORITIES.get(endpoint, DEFAULT_PRIORITY)
+        cost = len(data.get("media") or ()) or 1
+        chat_cost = 0 if endpoint == "sendChatAction" else cost
+
+        attempt = 0
+        while True:
+            await self.acquire(chat_id, priority, cost, chat_cost)
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.stats.retry_after += 1
+                self.pause(chat_id, e.retry_after)
+                continue
+            finally:
+                self.queue.running -= 1
+            self.stats.sent += 1
+            return result
+
+    def pause(self, chat_id: int | str | None, retry_after: float | timedelta) -> None:
+        if isinstance(retry_after, timedelta):
+            retry_after = retry_after.total_seconds()
+        log.warning("Telegram asked to wait %ss (chat %s)", retry_after, chat_id)
+        self.bucket(chat_id).paused_until = time.monotonic() + retry_after
+        self._wake.set()
+
+    async def acquire(
+        self,
+        chat_id: int | str | None,
+        priority: int,
+        cost: float,
+        chat_cost: float | None = None,
+    ) -> None:
+        future = asyncio.get_running_loop().create_future()
+        entry = (
+            priority,
+            next(self._arrivals),
+            chat_id,
+            cost,
+            cost if chat_cost is None else chat_cost,
+            time.monotonic(),
+            future,
+        )
+        bisect.insort(self._waiting, entry, key=lambda e: e[:2])
+        self.queue.enqueue()
+        await self.initialize()
+        self._wake.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+                self.queue.pending -= 1
+            else:
+                self.queue.running -= 1
+            raise
+
+    async def dispatch(self) -> None:
+        while True:
+            self._wake.clear()
+            timeout = self.release()
+            if self._waiting:
+                try:
+                    async with asyncio.timeout(timeout):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+            else:
+                await self._wake.wait()
+
+    def release(self) -> float:
+        """Let through every waiting request that has tokens, in order.
+
+        Returns how long until the next waiting request could have its tokens.
+        """
+        now = time.monotonic()
+        next_in = float("inf")
+        for entry in list(self._waiting):
+            _, _, chat_id, cost, chat_cost, queued_at, future = entry
+            global_delay = self.global_bucket.delay(cost, now)
+            chat_bucket = self.bucket(chat_id) if chat_id is not None else None
+            # a cost of 0 still waits out a pause of the chat
+            chat_delay = chat_bucket.delay(chat_cost, now) if chat_bucket else 0.0
+            delay = max(global_delay, chat_delay)
+            if delay > 0:
+                next_in = min(next_in, delay)
+                if global_delay > 0:
+                    break  # nobody else can go either
+                continue
+            self.global_bucket.take(cost)
+            if chat_bucket:
+                chat_bucket.take(chat_cost)
+            self._waiting.remove(entry)
+            self.queue.start(now - queued_at)
+            if not future.done():
+                future.set_result(None)
+        return next_in if next_in != float("inf") else 1.0
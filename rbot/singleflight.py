@@ -0,0 +1,43 @@
+"""Coalesce identical concurrent async calls into one.
+
+While a call for ``key`` is in flight, further calls with the same key do not
+start their own request: they wait for the first one and get its result (or its
+exception). Once it finishes the key is forgotten, so this is not a cache.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from rbot.metrics import FlightStats
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.stats = FlightStats()
+        self._calls: dict[Hashable, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+        self.stats.calls += 1
+        call = self._calls.get(key)
+        if call is not None:
+            self.stats.deduplicated += 1
+        else:
+            # its own task: the caller that started it going away must not
+            # cancel it for everybody else waiting on the same key
+            call = asyncio.ensure_future(fn(*args))
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self.forget(key, done))
+        # shield: a caller being cancelled must not cancel the shared call
+        return await asyncio.shield(call)
+
+    def forget(self, key: Hashable, call: asyncio.Future[Any]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            call.exception()  # mark retrieved when every caller went away
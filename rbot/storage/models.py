@@ -1,11 +1,59 @@
-import datetime
 import logging
-from typing import Any
+from typing import Annotated, Any, Generic, TypeVar
 
-from pydantic import BaseModel, ValidationError
+from pydantic import (
+    BaseModel,
+    TypeAdapter,
+    ValidationError,
+    ValidatorFunctionWrapHandler,
+    WrapValidator,
+    model_validator,
+)
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def parse_year(date: str) -> int:
+    """Year of a TMDB ``YYYY-MM-DD`` date, without going through ``strptime``."""
+    if len(date) < 4 or not date[:4].isdigit():
+        raise ValueError(f"Invalid date: {date!r}")
+    return int(date[:4])
+
+
+def build_vote_average(
+    vote_average: Any, ratings: dict[str, dict[str, Any]] | None
+) -> float:
+    if not vote_average and not ratings:
+        raise ValueError("vote_average is required")
+
+    if ratings:
+        try:
+            return ratings["imdb"]["value"]
+        except KeyError:
+            return 0.0
+
+    return round(float(vote_average), 1)
+
+
+def build_year(year: int | str | None, date: str | None) -> int | str:
+    if year:
+        return year
+
+    if date:
+        return parse_year(date)
+
+    raise ValueError("Release date or year is required")
+
+
+def build_poster_url(poster_path: str | None, backdrop_path: str | None) -> str:
+    if poster_path is None and backdrop_path is None:
+        return "https://image.tmdb.org/"
+    if poster_path:
+        return f"https://image.tmdb.org/t/p/original{poster_path}"
+    return f"https://image.tmdb.org/t/p/original{backdrop_path}"
+
 
 class Movie(BaseModel):
     id: int | None = None
@@ -19,68 +67,33 @@ class Movie(BaseModel):
     year: int | str | None = None
     ratings: dict[str, dict[str, Any]] | None = None
 
-    def __init__(self, **data: dict[str, Any]) -> None:
-        super().__init__(**data)
-        self.poster = self.build_poster_url()
-        self.year = self.build_year()
-        self.vote_average = self.build_vote_average()
+    @model_validator(mode="before")
+    @classmethod
+    def build_derived_fields(cls, data: Any) -> Any:
+        """Fill ``poster``, ``year`` and ``vote_average`` on the raw input.
+
+        Working on the input dict keeps this to plain dict operations instead
+        of three validated attribute assignments per instance.
+        """
+        if not isinstance(data, dict):
+            return data
+        get = data.get
+        return {
+            **data,
+            "poster": build_poster_url(get("poster_path"), get("backdrop_path")),
+            "year": build_year(get("year"), get("release_date")),
+            "vote_average": build_vote_average(get("vote_average"), get("ratings")),
+        }
 
     def __str__(self) -> str:
         return f"{self.title} ({self.year})\nRating: {self.rating}\nLink: {self.link}"
 
-    @property
-    def imdb_rating(self) -> float:
-        try:
-            value = self.ratings["imdb"]["value"]  # type: ignore
-        except KeyError:
-            return 0.0
-        return value
-
-    @property
-    def alternative_rating(self) -> float:
-        if not self.vote_average:
-            return 0.0
-        try:
-            value = round(self.vote_average, 1)
-        except KeyError:
-            return 0.0
-        return value
-
-    def build_vote_average(self) -> float:
-        if not self.vote_average and not self.ratings:
-            raise ValueError("vote_average is required")
-
-        if self.ratings:
-            return self.imdb_rating
-
-        if self.vote_average:
-            return self.alternative_rating
-
-        return 0.0
-
-    def build_year(self) -> int | str:
-        if self.year:
-            return self.year
-
-        if self.release_date:
-            date = datetime.datetime.strptime(self.release_date, "%Y-%m-%d")
-            return date.year
-
-        raise ValueError("Release date or year is required")
-
     @property
     def rating(self) -> str:
         if not self.vote_average:
             return "N/A"
         return f"{round(self.vote_average, 1)}/10"
 
-    def build_poster_url(self) -> str:
-        if self.poster_path is None and self.backdrop_path is None:
-            return "https://image.tmdb.org/"
-        if self.poster_path:
-            return f"https://image.tmdb.org/t/p/original{self.poster_path}"
-        return f"https://image.tmdb.org/t/p/original{self.backdrop_path}"
-
     @property
     def link(self) -> str:
         return f"https://www.themoviedb.org/movie/{self.id}"
@@ -99,11 +112,18 @@ class Serie(BaseModel):
     vote_count: int | None = None
     year: int | str | None = None
 
-    def __init__(self, **data: dict[str, Any]) -> None:
-        super().__init__(**data)
-        self.poster = self.build_poster_url()
-        self.vote_average = self.build_vote_average()
-        self.year = self.build_year()
+    @model_validator(mode="before")
+    @classmethod
+    def build_derived_fields(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+        get = data.get
+        return {
+            **data,
+            "poster": build_poster_url(get("poster_path"), get("backdrop_path")),
+            "vote_average": build_vote_average(get("vote_average"), get("ratings")),
+            "year": build_year(get("year"), get("first_air_date")),
+        }
 
     def __str__(self) -> str:
         return (
@@ -111,61 +131,55 @@ class Serie(BaseModel):
         )
 
     @property
-    def imdb_rating(self) -> float:
-        try:
-            value = self.ratings["imdb"]["value"]  # type: ignore
-        except KeyError:
-            return 0.0
-        return value
+    def rating(self) -> str:
+        if not self.vote_average:
+            return "N/A"
+        return f"{round(self.vote_average, 1)}/10"
 
     @property
-    def alternative_rating(self) -> float:
-        if not self.vote_average:
-            return 0.0
-        try:
-            value = round(self.vote_average, 1)
-        except KeyError:
-            return 0.0
-        return value
+    def link(self) -> str:
+        return f"https://www.themoviedb.org/tv/{self.id}"
 
-    def build_vote_average(self) -> float:
-        if not self.vote_average and not self.ratings:
-            raise ValueError("vote_average is required")
 
-        if self.ratings:
-            return self.imdb_rating
+class Page(BaseModel, Generic[T]):
+    """One page of TMDB search results and where it sits in the whole search."""
 
-        if self.vote_average:
-            return self.alternative_rating
+    results: list[T]
+    page: int = 1
+    total_pages: int = 1
 
-        return 0.0
+    def __bool__(self) -> bool:
+        return bool(self.results)
 
-    def build_year(self) -> int | str:
-        if self.year:
-            return self.year
 
-        if self.first_air_date:
-            date = datetime.datetime.strptime(self.first_air_date, "%Y-%m-%d")
-            return date.year
+def skip_invalid(kind: str) -> WrapValidator:
+    """Validator that logs an invalid item and turns it into ``None``."""
 
-        raise ValueError("Release date or year is required")
+    def validate(value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+        try:
+            return handler(value)
+        except ValidationError as e:
+            item_id = value.get("id") if isinstance(value, dict) else None
+            errors = [error["msg"] for error in e.errors()]
+            log.error("Not valid %s %s... skipping it: %s", kind, item_id, errors)
+        return None
 
-    @property
-    def rating(self) -> str:
-        if not self.vote_average:
-            return "N/A"
-        return f"{round(self.vote_average, 1)}/10"
+    return WrapValidator(validate)
 
-    def build_poster_url(self) -> str:
-        if self.poster_path is None and self.backdrop_path is None:
-            return "https://image.tmdb.org/"
-        if self.poster_path:
-            return f"https://image.tmdb.org/t/p/original{self.poster_path}"
-        return f"https://image.tmdb.org/t/p/original{self.backdrop_path}"
 
-    @property
-    def link(self) -> str:
-        return f"https://www.themoviedb.org/tv/{self.id}"
+# Validate a whole response in one call, turning invalid items into None
+movie_results = TypeAdapter(list[Annotated[Movie | None, skip_invalid("movie")]])
+serie_results = TypeAdapter(list[Annotated[Serie | None, skip_invalid("serie")]])
+
+
+def parse_movies(search_results: list[dict[Any, Any]]) -> list[Movie]:
+    movies = movie_results.validate_python(search_results)
+    return [movie for movie in movies if movie is not None]
+
+
+def parse_series(search_results: list[dict[Any, Any]]) -> list[Serie]:
+    series = serie_results.validate_python(search_results)
+    return [serie for serie in series if serie is not None]
 
 
 async def process_movie_search_result(result: dict[str, Any]) -> Movie:
@@ -176,18 +190,7 @@ async def process_movie_search_result(result: dict[str, Any]) -> Movie:
 async def process_movie_search_results(
     search_results: list[dict[Any, Any]],
 ) -> list[Movie]:
-    movies = []
-    for result in search_results:
-        try:
-            movie = await process_movie_search_result(result)
-            movies.append(movie)
-        except ValidationError as e:
-            errors = e.errors()
-            log.error(f"{repr(errors)}")
-            log.error("Not valid movie... skipping it: %s", e)
-        except ValueError as e:
-            log.error("Not valid movie... skipping it: %s", e)
-    return movies
+    return parse_movies(search_results)
 
 
 async def process_serie_search_result(result: dict[str, Any]) -> Serie:
@@ -198,11 +201,4 @@ async def process_serie_search_result(result: dict[str, Any]) -> Serie:
 async def process_serie_search_results(
     search_results: list[dict[Any, Any]],
 ) -> list[Serie]:
-    series = []
-    for result in search_results:
-        try:
-            serie = await process_serie_search_result(result)
-            series.append(serie)
-        except ValueError as e:
-            log.error("Not valid serie... skipping it: %s", e)
-    return series
+    return parse_series(search_results)
@@ -0,0 +1,99 @@
+"""Telegram ``file_id``s of posters we already uploaded, keyed by TMDB image path.
+
+The first time a poster is sent Telegram downloads it from TMDB; the
+``file_id`` it returns can be sent again without any download. The ids live
+in a Redis hash next to a sorted set of last-use times, which is used to evict
+the least recently used posters beyond ``POSTER_CACHE_SIZE``.
+"""
+
+import logging
+import time
+
+from rbot.conf import settings
+from rbot.metrics import CacheStats
+
+from .redis import pool
+
+log = logging.getLogger(__name__)
+
+
+class PosterCache:
+    def __init__(
+        self, maxsize: int = settings.POSTER_CACHE_SIZE, key: str = "rbot:posters"
+    ) -> None:
+        self.maxsize = maxsize
+        self.key = key
+        self.lru_key = f"{key}:lru"
+        self.stats = CacheStats()
+
+    async def get(self, path: str) -> str | None:
+        try:
+            async with pool.client.pipeline(transaction=False) as pipe:
+                pipe.hget(self.key, path)
+                pipe.zadd(self.lru_key, {path: time.time()}, xx=True)
+                file_id, _ = await pipe.execute()
+        except Exception:
+            log.warning("Poster cache: Redis unavailable", exc_info=True)
+            file_id = None
+
+        if file_id is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return file_id.decode()
+
+    async def get_many(self, paths: list[str]) -> list[str | None]:
+        """Like ``get`` for several posters, in a single round trip."""
+        if not paths:
+            return []
+        try:
+            async with pool.client.pipeline(transaction=False) as pipe:
+                pipe.hmget(self.key, paths)
+                pipe.zadd(self.lru_key, dict.fromkeys(paths, time.time()), xx=True)
+                file_ids, _ = await pipe.execute()
+        except Exception:
+            log.warning("Poster cache: Redis unavailable", exc_info=True)
+            file_ids = [None] * len(paths)
+
+        hits = [file_id.decode() if file_id else None for file_id in file_ids]
+        self.stats.misses += hits.count(None)
+        self.stats.hits += len(hits) - hits.count(None)
+        return hits
+
+    async def set(self, path: str, file_id: str) -> None:
+        await self.set_many({path: file_id})
+
+    async def set_many(self, file_ids: dict[str, str]) -> None:
+        if not file_ids:
+            return
+        try:
+            async with pool.client.pipeline(transaction=True) as pipe:
+                mapping: dict[str | bytes, str] = {
+                    path: file_id for path, file_id in file_ids.items()
+                }
+                pipe.hset(self.key, mapping=mapping)
+                pipe.zadd(self.lru_key, dict.fromkeys(file_ids, time.time()))
+                pipe.zcard(self.lru_key)
+                *_, size = await pipe.execute()
+            if size > self.maxsize:
+                await self.evict(size - self.maxsize)
+        except Exception:
+            log.warning("Poster cache: Redis unavailable", exc_info=True)
+
+    async def evict(self, count: int) -> None:
+        oldest = await pool.client.zpopmin(self.lru_key, count)
+        if oldest:
+            await pool.client.hdel(self.key, *(path for path, _ in oldest))
+            self.stats.evictions += len(oldest)
+
+    async def delete(self, path: str) -> None:
+        try:
+            async with pool.client.pipeline(transaction=True) as pipe:
+                pipe.hdel(self.key, path)
+                pipe.zrem(self.lru_key, path)
+                await pipe.execute()
+        except Exception:
+            log.warning("Poster cache: Redis unavailable", exc_info=True)
+
+
+posters = PosterCache()
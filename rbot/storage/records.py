@@ -0,0 +1,119 @@
+"""Compact, read-only records for titles kept resident in memory.
+
+A pydantic ``Movie`` carries a ratings dict of dicts, both image paths, the
+release date and a prebuilt poster URL. ``TitleRecord`` keeps only what is
+needed to render a card, in ``__slots__``, with interned strings and shared
+year/rating objects, and converts back to a ``Movie``/``Serie`` on demand.
+"""
+
+import sys
+from typing import Any
+
+from .models import Movie, Serie, build_poster_url
+
+_numbers: dict[tuple[type, int | float], int | float] = {}
+
+
+def intern_number(value: int | float) -> int | float:
+    """Share one object per distinct year/rating instead of one per title.
+
+    Keyed on the type too: ``8`` and ``8.0`` are equal but render differently.
+    """
+    return _numbers.setdefault((type(value), value), value)
+
+
+class TitleRecord:
+    __slots__ = (
+        "kind",
+        "id",
+        "tmdb_id",
+        "title",
+        "year",
+        "rating",
+        "image_path",
+        "vote_count",
+    )
+
+    kind: str
+    id: int | None
+    tmdb_id: int | None
+    title: str
+    year: int | None
+    rating: float
+    image_path: str | None
+    vote_count: int | None
+
+    def __init__(
+        self,
+        kind: str,
+        id: int | None,
+        tmdb_id: int | None,
+        title: str,
+        year: int | None,
+        rating: float,
+        image_path: str | None,
+        vote_count: int | None = None,
+    ) -> None:
+        set_ = object.__setattr__
+        set_(self, "kind", sys.intern(kind))
+        set_(self, "id", id)
+        set_(self, "tmdb_id", tmdb_id)
+        set_(self, "title", sys.intern(title))
+        set_(self, "year", None if year is None else intern_number(year))
+        set_(self, "rating", intern_number(rating))
+        set_(self, "image_path", None if image_path is None else sys.intern(image_path))
+        set_(self, "vote_count", vote_count)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"TitleRecord({self.kind}, {self.tmdb_id or self.id}, {self.title!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TitleRecord):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.id, self.tmdb_id))
+
+    @classmethod
+    def from_model(cls, model: Movie | Serie) -> "TitleRecord":
+        if isinstance(model, Serie):
+            kind, title, vote_count = "serie", model.name, model.vote_count
+        else:
+            kind, title, vote_count = "movie", model.title, None
+        year = int(model.year) if model.year else None
+        return cls(
+            kind,
+            model.id,
+            model.tmdbId,
+            title,
+            year,
+            model.vote_average or 0.0,
+            model.poster_path or model.backdrop_path,
+            vote_count,
+        )
+
+    def to_model(self) -> Movie | Serie:
+        """Rebuild the model with every field used to render it.
+
+        The values were validated when the record was made, so the model is
+        constructed without validating them again.
+        """
+        data: dict[str, Any] = {
+            "id": self.id,
+            "tmdbId": self.tmdb_id,
+            "year": self.year,
+            "vote_average": self.rating,
+            "poster_path": self.image_path,
+            "poster": build_poster_url(self.image_path, None),
+        }
+        if self.kind == "serie":
+            return Serie.model_construct(
+                name=self.title, vote_count=self.vote_count, **data
+            )
+        return Movie.model_construct(title=self.title, **data)
@@ -1,37 +1,101 @@
-import json
 import logging
+from typing import Any
 
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 
 from rbot.conf import settings
+from rbot.metrics import redis_latency, span
 
-from .models import Movie
+from .models import Movie, Serie
 
 log = logging.getLogger(__name__)
 
 
-async def write_movies_to_redis(movies: list[Movie]) -> None:
-    client = await redis.from_url(settings.REDIS_URL)
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        with span(redis_latency.labels("PIPELINE")):
+            return await super().execute(raise_on_error)
 
-    async with client.pipeline(transaction=True) as pipe:
-        for idx, movie in enumerate(movies):
-            i = str(idx)
-            movie_json = movie.model_dump_json()
-            await pipe.set(i, movie_json).execute()
 
+class InstrumentedRedis(redis.Redis):
+    """``redis.Redis`` timing every command, by name, and every pipeline."""
 
-async def read_one_movie_from_redis(idx: str) -> Movie | None:
-    try:
-        client = await redis.from_url(settings.REDIS_URL)
-        movie = await client.get(idx)
-        movie = json.loads(movie)
-        await client.delete(idx)
-        return Movie(**movie)
-    except Exception:
-        log.exception("Error while reading from redis")
-    return None
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        with span(redis_latency.labels(str(args[0]).upper())):
+            return await super().execute_command(*args, **options)
 
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
 
-async def clear_redis() -> None:
-    client = await redis.from_url(settings.REDIS_URL)
-    await client.flushdb()
+
+class RedisPool:
+    """Application-scoped Redis connection pool.
+
+    Opened in ``post_init`` and closed in ``post_shutdown``; storage helpers
+    borrow connections from it instead of building a new pool per call.
+    """
+
+    def __init__(self, url: str = settings.REDIS_URL) -> None:
+        self.url = url
+        self._pool: redis.BlockingConnectionPool | None = None
+        self._client: redis.Redis | None = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._pool = redis.BlockingConnectionPool.from_url(
+                self.url,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            )
+            self._client = InstrumentedRedis(connection_pool=self._pool)
+        return self._client
+
+    async def start(self) -> None:
+        log.info("Starting Redis pool")
+        await self.client.ping()
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            log.info("Closing Redis pool")
+            # the client does not own the pool it was given, close it here
+            await self._pool.disconnect()
+            self._pool = self._client = None
+
+
+pool = RedisPool()
+
+
+async def write_movies_to_redis(
+    key: str,
+    movies: list[Movie] | list[Serie],
+    kind: str,
+    ttl: int,
+    start: int = 0,
+    fields: dict[str, str | int] | None = None,
+) -> None:
+    """Write a whole result set as one hash in a single round-trip.
+
+    All results go in one ``HSET`` together with the ``EXPIRE``, queued in one
+    MULTI/EXEC pipeline, so the cost no longer grows with the number of results.
+    Results are numbered from ``start`` and ``fields`` are written alongside.
+    """
+    mapping: dict[str | bytes, str | int] = {
+        str(idx): movie.model_dump_json() for idx, movie in enumerate(movies, start)
+    }
+    mapping["kind"] = kind
+    for field, value in (fields or {}).items():
+        mapping[field] = value
+
+    async with pool.client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, ttl)
+        await pipe.execute()
@@ -0,0 +1,130 @@
+"""Per-chat search sessions.
+
+Each ``/search`` or ``/serie`` stores its results in one Redis hash keyed by the
+chat id and a short random search id, with a TTL. Result ``n`` lives under field
+``"n"`` and the hash also records the result ``kind`` so "Next" can rebuild the
+right model with a single ``HMGET``. Sessions of different chats (or different
+searches in the same chat) never touch each other and no flush is needed.
+
+The hash is also the cursor over the TMDB search: it keeps the ``query``, the
+last ``page`` loaded, TMDB's ``total_pages`` and the ``total_results``
+stored, so later pages can be appended on demand with ``append_session_page``.
+"""
+
+import json
+import logging
+import secrets
+from typing import NamedTuple
+
+from rbot.conf import settings
+
+from .models import Movie, Serie
+from .redis import pool, write_movies_to_redis
+
+log = logging.getLogger(__name__)
+
+MODELS: dict[str, type[Movie] | type[Serie]] = {"movie": Movie, "serie": Serie}
+
+
+CURSOR_FIELDS = ("kind", "query", "page", "total_pages", "total_results")
+
+
+class SessionCursor(NamedTuple):
+    kind: str
+    query: str
+    page: int
+    total_pages: int
+    total_results: int
+
+    @property
+    def has_more(self) -> bool:
+        return bool(self.query) and self.page < self.total_pages
+
+
+def session_key(chat_id: int, search_id: str) -> str:
+    return f"rbot:search:{chat_id}:{search_id}"
+
+
+async def create_session(
+    chat_id: int,
+    results: list[Movie] | list[Serie],
+    query: str = "",
+    total_pages: int = 1,
+) -> str:
+    kind = "serie" if results and isinstance(results[0], Serie) else "movie"
+    search_id = secrets.token_hex(4)
+    key = session_key(chat_id, search_id)
+    cursor: dict[str, str | int] = {
+        "query": query,
+        "page": 1,
+        "total_pages": total_pages,
+        "total_results": len(results),
+    }
+    await write_movies_to_redis(
+        key, results, kind=kind, ttl=settings.SEARCH_SESSION_TTL, fields=cursor
+    )
+    return search_id
+
+
+async def append_session_page(
+    chat_id: int,
+    search_id: str,
+    cursor: SessionCursor,
+    results: list[Movie] | list[Serie],
+) -> None:
+    """Store the page after ``cursor.page`` behind the results already stored."""
+    key = session_key(chat_id, search_id)
+    fields: dict[str, str | int] = {
+        "page": cursor.page + 1,
+        "total_results": cursor.total_results + len(results),
+    }
+    await write_movies_to_redis(
+        key,
+        results,
+        kind=cursor.kind,
+        ttl=settings.SEARCH_SESSION_TTL,
+        start=cursor.total_results,
+        fields=fields,
+    )
+
+
+def parse_cursor(values: list[bytes | None]) -> SessionCursor | None:
+    kind, query, page, total_pages, total_results = values
+    if kind is None:
+        return None
+    return SessionCursor(
+        kind=kind.decode(),
+        query=query.decode() if query else "",
+        page=int(page or 1),
+        total_pages=int(total_pages or 1),
+        total_results=int(total_results or 0),
+    )
+
+
+async def read_session_cursor(chat_id: int, search_id: str) -> SessionCursor | None:
+    key = session_key(chat_id, search_id)
+    return parse_cursor(await pool.client.hmget(key, *CURSOR_FIELDS))
+
+
+async def read_session(
+    chat_id: int, search_id: str, idx: int
+) -> tuple[Movie | Serie | None, SessionCursor | None]:
+    """Result ``idx`` of a session and its cursor, read with one ``HMGET``."""
+    key = session_key(chat_id, search_id)
+    try:
+        *values, data = await pool.client.hmget(key, *CURSOR_FIELDS, str(idx))
+        cursor = parse_cursor(values)
+        if cursor is None or data is None:
+            return None, cursor
+        model = MODELS[cursor.kind]
+        return model(**json.loads(data)), cursor
+    except Exception:
+        log.exception("Error while reading search session %s", key)
+    return None, None
+
+
+async def read_session_result(
+    chat_id: int, search_id: str, idx: int
+) -> Movie | Serie | None:
+    result, _ = await read_session(chat_id, search_id, idx)
+    return result
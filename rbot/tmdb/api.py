@@ -1,73 +1,184 @@
 import logging
-import urllib
+from typing import Any
 
 import httpx
 from decouple import config
+from pydantic import TypeAdapter
 
+from rbot.conf import settings
 from rbot.storage.models import (
     Movie,
+    Page,
     Serie,
     process_movie_search_result,
     process_movie_search_results,
     process_serie_search_results,
 )
+from rbot.tmdb.cache import ResponseCache, normalize_query
+from rbot.tmdb.images import images
+from rbot.transport import ResilientTransport
 
-client = httpx.Client()
 log = logging.getLogger(__name__)
 TMDB_API_KEY = config("TMDB_API_KEY")
 TMDB_BASE_URL = "https://api.themoviedb.org/3/"
 
 
-async def search_movie(query: str) -> list[Movie]:
-    query_params_dict = {
-        "query": query,
-        "api_key": TMDB_API_KEY,
-    }
+class TMDBClient:
+    """Long-lived async client for the TMDB API.
+
+    The underlying ``httpx.AsyncClient`` keeps a pool of keep-alive (HTTP/2 when
+    available) connections, so it has to be opened once and closed on shutdown
+    (see ``post_init``/``post_shutdown`` in ``rbot.utils``). It is also created
+    lazily on first use, so the module functions work outside the Application.
+    Requests go through a ``ResilientTransport`` (retries, circuit breaker and
+    optional hedging of GETs).
+    """
+
+    def __init__(self, base_url: str = TMDB_BASE_URL, api_key: str = TMDB_API_KEY):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.transport = ResilientTransport(
+            httpx.AsyncHTTPTransport(
+                http2=settings.TMDB_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=settings.TMDB_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.TMDB_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+            name="tmdb",
+            hedge_after=settings.TMDB_HEDGE_AFTER,
+        )
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(
+                    settings.TMDB_TIMEOUT, connect=settings.TMDB_CONNECT_TIMEOUT
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def start(self) -> None:
+        log.info("Starting TMDB client")
+        self.client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            log.info("Closing TMDB client")
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, path: str, **params: str | int | bool) -> dict:
+        params["api_key"] = self.api_key
+        response = await self.client.get(path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+
+client = TMDBClient()
+cache = ResponseCache()
+
+movie_page = TypeAdapter(Page[Movie])
+serie_page = TypeAdapter(Page[Serie])
+# mypy sees ``Movie | None`` as a ``UnionType`` value, not as the type
+movie_or_none: TypeAdapter[Movie | None] = TypeAdapter(Movie | None)  # type: ignore[arg-type]
+configuration = TypeAdapter(dict[str, Any])
+
+
+async def fetch_movies(query: str, page: int = 1) -> Page[Movie]:
+    data = await client.get("search/movie", query=query, page=page)
+
+    movies = await process_movie_search_results(data["results"])
+    log.debug(f"Found {len(movies)} movies")
+    return Page[Movie](
+        results=movies, page=page, total_pages=data.get("total_pages", 1)
+    )
 
-    query_params = urllib.parse.urlencode(query_params_dict)
-    TMDB_SEARCH_URL = f"{TMDB_BASE_URL}search/movie?{query_params}"
 
-    response = client.get(TMDB_SEARCH_URL)
-    response.raise_for_status()
+async def fetch_series(query: str, page: int = 1) -> Page[Serie]:
+    data = await client.get("search/tv", query=query, include_adult=False, page=page)
 
-    movies = await process_movie_search_results(response.json()["results"])
+    movies = await process_serie_search_results(data["results"])
     log.debug(f"Found {len(movies)} movies")
-    return movies
+    return Page[Serie](
+        results=movies, page=page, total_pages=data.get("total_pages", 1)
+    )
 
 
-async def search_serie(query: str) -> list[Serie]:
-    query_params_dict = {
-        "query": query,
-        "api_key": TMDB_API_KEY,
-        "include_adult": False,
-    }
+async def fetch_movie_detail(movie_id: int) -> Movie | None:
+    try:
+        data = await client.get(f"movie/{movie_id}")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != httpx.codes.NOT_FOUND:
+            raise
+        log.info("Movie %s not found", movie_id)
+        return None
 
-    query_params = urllib.parse.urlencode(query_params_dict)
-    TMDB_SEARCH_URL = f"{TMDB_BASE_URL}search/tv?{query_params}"
+    try:
+        movie = await process_movie_search_result(data)
+        return movie
+    except Exception:
+        log.exception("Movie not found")
+    return None
 
-    response = client.get(TMDB_SEARCH_URL)
-    response.raise_for_status()
 
-    movies = await process_serie_search_results(response.json()["results"])
-    log.debug(f"Found {len(movies)} movies")
-    return movies
+async def search_movie_page(query: str, page: int = 1) -> Page[Movie]:
+    query = normalize_query(query)
+    return await cache.get_or_fetch(
+        f"search/movie:{query}:{page}",
+        movie_page,
+        settings.TMDB_CACHE_SEARCH_TTL,
+        fetch_movies,
+        query,
+        page,
+    )
 
 
-async def get_movie_detail(movie_id: int) -> Movie | dict:
-    query_params_dict = {
-        "api_key": TMDB_API_KEY,
-    }
-    query_params = urllib.parse.urlencode(query_params_dict)
+async def search_serie_page(query: str, page: int = 1) -> Page[Serie]:
+    query = normalize_query(query)
+    return await cache.get_or_fetch(
+        f"search/tv:{query}:{page}",
+        serie_page,
+        settings.TMDB_CACHE_SEARCH_TTL,
+        fetch_series,
+        query,
+        page,
+    )
 
-    TMDB_DETAIL_URL = f"{TMDB_BASE_URL}movie/{movie_id}?{query_params}"
 
-    response = client.get(TMDB_DETAIL_URL)
+async def search_movie(query: str) -> list[Movie]:
+    return (await search_movie_page(query)).results
 
-    response.raise_for_status()
 
-    try:
-        movie = await process_movie_search_result(response.json())
-        return movie
-    except Exception:
-        log.exception("Movie not found")
-    return {}
+async def search_serie(query: str) -> list[Serie]:
+    return (await search_serie_page(query)).results
+
+
+async def get_movie_detail(movie_id: int) -> Movie | dict:
+    movie = await cache.get_or_fetch(
+        f"movie:{movie_id}",
+        movie_or_none,
+        settings.TMDB_CACHE_DETAIL_TTL,
+        fetch_movie_detail,
+        movie_id,
+    )
+    return movie or {}
+
+
+async def fetch_configuration() -> dict[str, Any]:
+    return await client.get("configuration")
+
+
+async def load_image_configuration() -> None:
+    data = await cache.get_or_fetch(
+        "configuration",
+        configuration,
+        settings.TMDB_CACHE_DETAIL_TTL,
+        fetch_configuration,
+    )
+    images.load(data)
+    log.info("TMDB poster sizes: %s", images.poster_sizes)
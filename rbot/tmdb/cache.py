@@ -0,0 +1,132 @@
+"""Two-tier cache for TMDB responses.
+
+The first tier is a bounded in-process LRU holding ready-to-use models, so a
+repeated lookup never leaves the process. The second tier is the shared Redis,
+holding the same values as JSON so they survive restarts. Empty results are
+cached too (for a shorter time), so a typo is not looked up over and over.
+"""
+
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from pydantic import TypeAdapter
+
+from rbot.conf import settings
+from rbot.metrics import CacheStats
+from rbot.singleflight import SingleFlight
+from rbot.storage.redis import pool
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MISSING: Any = object()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class ResponseCache:
+    def __init__(
+        self, maxsize: int = settings.TMDB_CACHE_SIZE, prefix: str = "rbot:tmdb:"
+    ) -> None:
+        self.maxsize = maxsize
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self.flight = SingleFlight()
+        self._local: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def _set_local(self, key: str, value: Any, ttl: float) -> None:
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _get_local(self, key: str) -> Any:
+        entry = self._local.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            self.stats.expired += 1
+            return MISSING
+        self._local.move_to_end(key)
+        return value
+
+    async def get(self, key: str, adapter: TypeAdapter[T]) -> T:
+        value = self._get_local(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return value
+
+        try:
+            async with pool.client.pipeline(transaction=False) as pipe:
+                pipe.get(self.prefix + key)
+                pipe.pttl(self.prefix + key)
+                raw, pttl = await pipe.execute()
+        except Exception:
+            log.warning("TMDB cache: Redis unavailable, skipping it", exc_info=True)
+            raw = None
+
+        if raw is None:
+            self.stats.misses += 1
+            return MISSING
+
+        self.stats.redis_hits += 1
+        value = adapter.validate_json(raw)
+        if pttl > 0:
+            self._set_local(key, value, pttl / 1000)
+        return value
+
+    async def set(self, key: str, value: T, adapter: TypeAdapter[T], ttl: int) -> None:
+        self._set_local(key, value, ttl)
+        try:
+            await pool.client.set(self.prefix + key, adapter.dump_json(value), ex=ttl)
+        except Exception:
+            log.warning("TMDB cache: Redis unavailable, skipping it", exc_info=True)
+
+    async def _fetch_and_set(
+        self,
+        key: str,
+        adapter: TypeAdapter[T],
+        ttl: int,
+        fetch: Callable[..., Awaitable[T]],
+        *args: Any,
+    ) -> T:
+        value = await fetch(*args)
+        if not value:
+            ttl = settings.TMDB_CACHE_NEGATIVE_TTL
+        await self.set(key, value, adapter, ttl)
+        return value
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        adapter: TypeAdapter[T],
+        ttl: int,
+        fetch: Callable[..., Awaitable[T]],
+        *args: Any,
+    ) -> T:
+        """Return the cached value for ``key`` or ``await fetch(*args)`` and cache it.
+
+        Concurrent misses for the same key share one fetch (see ``SingleFlight``).
+        """
+        value = await self.get(key, adapter)
+        if value is MISSING:
+            value = await self.flight.do(
+                key, self._fetch_and_set, key, adapter, ttl, fetch, *args
+            )
+        return value
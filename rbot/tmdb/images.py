@@ -0,0 +1,54 @@
+"""Pick a TMDB image size for where the poster is going to be shown.
+
+``/t/p/original`` posters can be several megabytes, while a chat card looks the
+same at ``w500``. ``POSTER_SIZES`` maps a rendering context ("card", "album",
+"thumb") to the wanted size; the closest size TMDB actually offers (from its
+``/configuration`` endpoint, loaded once at startup) is used.
+"""
+
+from typing import Any
+
+from rbot.conf import settings
+from rbot.storage.models import Movie, Serie
+
+DEFAULT_BASE_URL = "https://image.tmdb.org/t/p/"
+DEFAULT_POSTER_SIZES = ["w92", "w154", "w185", "w342", "w500", "w780", "original"]
+DEFAULT_BACKDROP_SIZES = ["w300", "w780", "w1280", "original"]
+
+
+def size_width(size: str) -> float:
+    if size.startswith("w") and size[1:].isdigit():
+        return int(size[1:])
+    return float("inf")  # "original" and height-based sizes go last
+
+
+class ImageConfig:
+    def __init__(self) -> None:
+        self.base_url = DEFAULT_BASE_URL
+        self.poster_sizes = DEFAULT_POSTER_SIZES
+        self.backdrop_sizes = DEFAULT_BACKDROP_SIZES
+
+    def load(self, configuration: dict[str, Any]) -> None:
+        images = configuration["images"]
+        self.base_url = images["secure_base_url"]
+        self.poster_sizes = sorted(images["poster_sizes"], key=size_width)
+        self.backdrop_sizes = sorted(images["backdrop_sizes"], key=size_width)
+
+    def size_for(self, context: str, sizes: list[str]) -> str:
+        wanted = size_width(settings.POSTER_SIZES.get(context, "original"))
+        for size in sizes:
+            if size_width(size) >= wanted:
+                return size
+        return sizes[-1]
+
+    def poster_url(self, item: Movie | Serie, context: str = "card") -> str:
+        if item.poster_path:
+            size = self.size_for(context, self.poster_sizes)
+            return f"{self.base_url}{size}{item.poster_path}"
+        if item.backdrop_path:
+            size = self.size_for(context, self.backdrop_sizes)
+            return f"{self.base_url}{size}{item.backdrop_path}"
+        return item.poster  # type: ignore
+
+
+images = ImageConfig()
@@ -0,0 +1,253 @@
+"""Resilience middleware for the outbound ``httpx`` clients.
+
+``ResilientTransport`` wraps the real transport of a client and adds, per
+host:
+
+- retries with full-jitter exponential backoff for failures that are safe to
+  repeat: connection failures for any method, timeouts and 429/502/503/504
+  answers for idempotent methods only. Retries are drawn from a
+  ``RetryBudget``, so when a backend is struggling retries stay a small share
+  of the traffic instead of multiplying it.
+- a ``CircuitBreaker`` that opens after ``failure_threshold`` consecutive
+  failures and fails fast with ``CircuitOpenError`` until ``reset_timeout``
+  has passed, then lets one probe through to decide whether to close again.
+- optional hedging of GETs: when the first attempt has not answered after
+  ``hedge_after`` seconds a second one is sent and the first to answer wins.
+
+Timeouts are the ones each client is built with (``TMDB_TIMEOUT``,
+``RADARR_TIMEOUT``...), so they apply per host and per attempt.
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+from rbot.conf import settings
+from rbot.metrics import BreakerStats, TransportStats, http_latency, span
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The backend is considered down and the request was not sent."""
+
+
+class RetryBudget:
+    """Token bucket of retries: every request earns ``ratio`` of a retry.
+
+    ``minimum`` tokens are always kept available so a quiet client can still
+    retry, and the bucket never holds more than ``maximum``.
+    """
+
+    def __init__(
+        self,
+        ratio: float = settings.HTTP_RETRY_BUDGET_RATIO,
+        minimum: float = 3.0,
+        maximum: float = 20.0,
+    ) -> None:
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = minimum
+
+    def deposit(self) -> None:
+        self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.HTTP_BREAKER_FAILURES,
+        reset_timeout: float = settings.HTTP_BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.stats = BreakerStats()
+        self._probing = False
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker(state={self.state}, {self.stats!r})"
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.stats.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.stats.rejected += 1
+                return False
+            self._probing = True
+        return True
+
+    def release(self) -> None:
+        """Give back a probe slot without judging the backend."""
+        self._probing = False
+
+    def success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        if self.state != self.CLOSED:
+            log.info("Circuit closed again")
+            self.state = self.CLOSED
+            self.stats.closed += 1
+
+    def failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                log.warning("Circuit open for %ss", self.reset_timeout)
+                self.stats.opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        name: str = "http",
+        retries: int = settings.HTTP_RETRIES,
+        backoff: float = settings.HTTP_RETRY_BACKOFF,
+        max_backoff: float = 5.0,
+        hedge_after: float = 0.0,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.transport = transport
+        self.name = name
+        self.latency = http_latency.labels(name)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.budget = budget or RetryBudget()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.stats = TransportStats()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker()
+        return self.breakers[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with span(self.latency):
+            response = await self.retrying(request)
+        if response.status_code >= 500:
+            self.latency.errors += 1
+        return response
+
+    async def retrying(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        self.budget.deposit()
+        idempotent = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = await self.attempt(request)
+            except CircuitOpenError:
+                raise
+            except httpx.TransportError as e:
+                safe = idempotent or isinstance(e, httpx.ConnectError)
+                if not safe or not await self.backoff_before_retry(attempt):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or not idempotent:
+                    return response
+                if not await self.backoff_before_retry(attempt):
+                    return response
+                await response.aclose()
+            attempt += 1
+
+    async def backoff_before_retry(self, attempt: int) -> bool:
+        if attempt >= self.retries:
+            return False
+        if not self.budget.withdraw():
+            self.stats.budget_exhausted += 1
+            return False
+        self.stats.retries += 1
+        cap = min(self.max_backoff, self.backoff * 2**attempt)
+        await asyncio.sleep(random.uniform(0, cap))
+        return True
+
+    async def attempt(self, request: httpx.Request) -> httpx.Response:
+        if self.hedge_after > 0 and request.method == "GET":
+            return await self.hedged(request)
+        return await self.send(request)
+
+    async def send(self, request: httpx.Request) -> httpx.Response:
+        breaker = self.breaker(request.url.host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{request.url.host} is down", request=request)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            breaker.failure()
+            raise
+        except BaseException:
+            # cancelled (e.g. a hedge that lost): no verdict on the backend
+            breaker.release()
+            raise
+        if response.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        return response
+
+    async def hedged(self, request: httpx.Request) -> httpx.Response:
+        first = asyncio.create_task(self.send(request))
+        pending = {first}
+        winner: asyncio.Task | None = None
+        error: BaseException | None = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                self.stats.hedges += 1
+                pending.add(asyncio.create_task(self.send(request)))
+            while winner is None:
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        await task.result().aclose()
+                if winner is not None or not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, httpx.Response):
+                    await result.aclose()
+
+        if winner is None:
+            raise error  # type: ignore
+        if winner is not first:
+            self.stats.hedge_wins += 1
+        return winner.result()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -1,17 +1,48 @@
+import asyncio
 import json
 import logging
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any, NamedTuple
 
-from radarr import api as radarr_api
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from redis.exceptions import RedisError
+from telegram import (
+    Bot,
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InputMediaPhoto,
+    Message,
+    error,
+)
 from telegram.constants import ChatAction
 from telegram.ext import Application
 
 from rbot.conf import settings
-from rbot.storage.models import Movie, Serie
-from rbot.storage.redis import read_one_movie_from_redis
+from rbot.monitoring import metrics_server, register_collectors
+from rbot.prefetch import Prefetcher
+from rbot.radarr import api as radarr_api
+from rbot.radarr.bulk import BulkProgress, bulk_add
+from rbot.radarr.jobs import add_jobs
+from rbot.radarr.library import library, sync_library
+from rbot.singleflight import SingleFlight
+from rbot.storage.models import Movie, Page, Serie
+from rbot.storage.posters import posters
+from rbot.storage.redis import pool as redis_pool
+from rbot.storage.sessions import (
+    SessionCursor,
+    append_session_page,
+    read_session,
+    read_session_cursor,
+)
+from rbot.tmdb import api as tmdb_api
+from rbot.tmdb.images import images
 
 log = logging.getLogger(__name__)
 
+# pages being loaded, so a prefetch and a "Next" waiting for it share one fetch
+pages = SingleFlight()
+background_tasks: set[asyncio.Task] = set()
+
 
 async def send_typing_action(bot: Bot, chat_id: int) -> None:
     await bot.send_chat_action(action=ChatAction.TYPING, chat_id=chat_id)
@@ -19,6 +50,8 @@ async def send_typing_action(bot: Bot, chat_id: int) -> None:
 
 async def accepted_movie(data: dict[str, str]) -> str:
     movie_id = data["movie_id"]
+    if movie_id in library:
+        return "Movie is already in the library!"
     response = await radarr_api.add_movie_to_radarr(movie_id)
     return response
 
@@ -29,38 +62,233 @@ async def accepted_serie(data: dict[str, str]) -> str:
     return response
 
 
-async def show_next_movie(data: dict[str, str]) -> tuple[str, Movie] | None:
-    idx = data["idx"]
-    movie = await read_one_movie_from_redis(idx)
-    if movie:
-        return idx + 1, movie
-    return None
+async def load_next_page(chat_id: int, search_id: str, cursor: SessionCursor) -> None:
+    key = (chat_id, search_id, cursor.page + 1)
+    await pages.do(key, _load_next_page, chat_id, search_id, cursor)
+
+
+async def _load_next_page(chat_id: int, search_id: str, cursor: SessionCursor) -> None:
+    # the page may have been stored since ``cursor`` was read
+    current = await read_session_cursor(chat_id, search_id)
+    if current is None or current.page != cursor.page:
+        return
+    page: Page[Movie] | Page[Serie]
+    if cursor.kind == "serie":
+        page = await tmdb_api.search_serie_page(cursor.query, cursor.page + 1)
+    else:
+        page = await tmdb_api.search_movie_page(cursor.query, cursor.page + 1)
+    await append_session_page(chat_id, search_id, cursor, page.results)
+    log.info("Loaded page %s of search %s", page.page, search_id)
+
+
+class SearchExpired(LookupError):
+    """The search session of a callback is missing or has expired."""
+
+
+class Prefetched(NamedTuple):
+    item: Movie | Serie
+    cursor: SessionCursor
+    file_id: str | None
+
+
+prefetcher: Prefetcher[Prefetched] = Prefetcher()
+
+
+async def read_result(
+    chat_id: int, search_id: str, idx: int
+) -> tuple[Movie | Serie | None, SessionCursor | None]:
+    movie, cursor = await read_session(chat_id, search_id, idx)
+    while movie is None and cursor is not None and cursor.has_more:
+        await load_next_page(chat_id, search_id, cursor)
+        movie, cursor = await read_session(chat_id, search_id, idx)
+    return movie, cursor
+
+
+async def warm_result(chat_id: int, search_id: str, idx: int) -> Prefetched | None:
+    """Load result ``idx`` and warm what showing and confirming it will need.
+
+    That is the TMDB detail cache, the poster ``file_id`` and, if the startup
+    sync failed, the Radarr library index used to mark titles already added.
+    """
+    item, cursor = await read_result(chat_id, search_id, idx)
+    if item is None or cursor is None:
+        return None
+
+    async def no_file_id() -> None:
+        return None
+
+    path = item.poster_path or item.backdrop_path
+    jobs: list[Awaitable[Any]] = [posters.get(path) if path else no_file_id()]
+    if isinstance(item, Movie):
+        jobs.append(tmdb_api.get_movie_detail(item.id))  # type: ignore
+    if library.synced_at is None:
+        jobs.append(library.sync())
+    file_id, *_ = await asyncio.gather(*jobs, return_exceptions=True)
+    if not isinstance(file_id, str):
+        file_id = None
+    return Prefetched(item, cursor, file_id)
+
+
+def prefetch_result(chat_id: int, search_id: str, idx: int) -> None:
+    prefetcher.schedule(chat_id, (search_id, idx), warm_result, chat_id, search_id, idx)
+
+
+def prefetch_next_page(chat_id: int, search_id: str, cursor: SessionCursor) -> None:
+    async def prefetch() -> None:
+        try:
+            await load_next_page(chat_id, search_id, cursor)
+        except Exception:
+            log.exception("Could not prefetch the next page of %s", search_id)
+
+    task = asyncio.create_task(prefetch())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def confirm(query: CallbackQuery, data: dict[str, str]) -> None:
+    """Add the confirmed title, queued for the add workers when they run.
+
+    The message shows "Adding..." right away and the worker edits it once
+    Radarr is done. Without workers, or if the queue is unreachable, the
+    title is added inline as before.
+    """
+    kind = "movie" if "movie_id" in data else "serie"
+    tmdb_id = str(data[f"{kind}_id"])
+    if kind == "movie" and tmdb_id in library:
+        await edit_query_message(query, "Movie is already in the library!")
+        return
+
+    if settings.ADD_JOB_WORKERS:
+        try:
+            await queue_add(query, kind, tmdb_id)
+            return
+        except RedisError:
+            log.warning("Could not queue %s %s, adding it inline", kind, tmdb_id)
+
+    message = query.message
+    await send_typing_action(query.get_bot(), message.chat_id)  # type: ignore
+    if kind == "movie":
+        response = await accepted_movie(data)
+    else:
+        response = await accepted_serie(data)
+    await edit_query_message(query, response)
+
+
+async def queue_add(query: CallbackQuery, kind: str, tmdb_id: str) -> None:
+    if not await add_jobs.reserve(kind, tmdb_id):
+        label = kind.capitalize()
+        await edit_query_message(query, f"{label} is already being added!")
+        return
+    await edit_query_message(query, f"Adding {kind}...")
+    message = query.message
+    await add_jobs.push(
+        kind,
+        tmdb_id,
+        message.chat_id,  # type: ignore
+        message.message_id,  # type: ignore
+        caption=bool(message.photo),  # type: ignore
+    )
+
+
+async def run_bulk_add(bot: Bot, chat_id: int, ids: list[str]) -> None:
+    """Add ``ids`` to Radarr, keeping one progress message up to date."""
+    message = await bot.send_message(
+        chat_id=chat_id, text=f"Adding {len(ids)} movies...", disable_notification=True
+    )
+
+    async def report(progress: BulkProgress) -> None:
+        try:
+            await message.edit_text(str(progress))
+        except error.TelegramError:
+            log.warning("Could not update bulk add progress", exc_info=True)
+
+    progress = await bulk_add(ids, report)
+    log.info("Bulk add done: %s", progress)
+
+
+async def show_next_movie(
+    chat_id: int, data: dict[str, str]
+) -> tuple[int, Movie | Serie, str | None] | None:
+    """Result ``data["idx"]`` of the search session ``data["sid"]``.
+
+    Returns the index, the result and its poster ``file_id`` if it was
+    prefetched, or None past the last result, and raises ``SearchExpired`` if
+    the session is gone. Later TMDB pages are loaded on demand: in the
+    background once "Next" gets within ``SEARCH_PREFETCH_MARGIN`` results of
+    the end, or right away when the result is not stored yet.
+    """
+    search_id = data.get("sid")
+    if not search_id:
+        raise SearchExpired
+    idx = int(data["idx"])
+    movie: Movie | Serie | None
+    cursor: SessionCursor | None
+    file_id = None
+    prefetched = prefetcher.take(chat_id, (search_id, idx))
+    if prefetched is not None:
+        movie, cursor, file_id = prefetched
+    else:
+        movie, cursor = await read_result(chat_id, search_id, idx)
+
+    if cursor is None:
+        raise SearchExpired(search_id)
+    if movie is None:
+        return None
+    if (
+        cursor.has_more
+        and idx + settings.SEARCH_PREFETCH_MARGIN >= cursor.total_results
+    ):
+        prefetch_next_page(chat_id, search_id, cursor)
+    return idx, movie, file_id
 
 
 async def send_message(bot: Bot, chat_id: int, text: str) -> None:
     await bot.send_message(chat_id=chat_id, text=text, disable_notification=True)
 
 
+def build_buttons(
+    idx: int = 0,
+    movie_id: int | str | None = None,
+    serie_id: int | str | None = None,
+    search_id: str | None = None,
+) -> list[list[InlineKeyboardButton]]:
+    if movie_id:
+        callback_data_confirm = json.dumps({"movie_id": movie_id})
+    else:
+        callback_data_confirm = json.dumps({"serie_id": serie_id})
+    confirm_button = InlineKeyboardButton(
+        "Confirm", callback_data=callback_data_confirm
+    )
+    buttons = [[confirm_button]]
+    if search_id:
+        callback_data_next = json.dumps({"idx": idx + 1, "sid": search_id})
+        next_button = InlineKeyboardButton("Next", callback_data=callback_data_next)
+        buttons[0].append(next_button)
+    return buttons
+
+
+def result_buttons(
+    item: Movie | Serie, idx: int = 0, search_id: str | None = None
+) -> InlineKeyboardMarkup:
+    if isinstance(item, Serie):
+        buttons = build_buttons(idx, serie_id=item.id, search_id=search_id)
+    else:
+        buttons = build_buttons(idx, movie_id=item.id, search_id=search_id)
+    return InlineKeyboardMarkup(buttons)
+
+
 async def send_buttons(
     bot: Bot,
     chat_id: int,
     text: str,
-    idx: int,
-    movie_id: str | None = None,
-    serie_id: str | None = None,
+    idx: int = 0,
+    movie_id: int | str | None = None,
+    serie_id: int | str | None = None,
+    search_id: str | None = None,
     buttons: list[list[InlineKeyboardButton]] | None = None,
 ) -> None:
     if not buttons:
-        if movie_id:
-            callback_data_confirm = json.dumps({"movie_id": movie_id})
-        else:
-            callback_data_confirm = json.dumps({"serie_id": serie_id})
-        callback_data_next = json.dumps({"idx": idx + 1})
-        confirm_button = InlineKeyboardButton(
-            "Confirm", callback_data=callback_data_confirm
-        )
-        next_button = InlineKeyboardButton("Next", callback_data=callback_data_next)
-        buttons = [[confirm_button, next_button]]
+        buttons = build_buttons(idx, movie_id, serie_id, search_id)
     reply_markup = InlineKeyboardMarkup(buttons)
 
     await bot.send_message(
@@ -76,45 +304,326 @@ async def send_photo(
     chat_id: int,
     photo: str | bytes,
     caption: str,
-) -> None:
-    await bot.send_photo(
-        chat_id=chat_id, photo=photo, caption=caption, disable_notification=True
+    reply_markup: InlineKeyboardMarkup | None = None,
+) -> Message:
+    return await bot.send_photo(
+        chat_id=chat_id,
+        photo=photo,
+        caption=caption,
+        reply_markup=reply_markup,
+        disable_notification=True,
     )
 
 
-async def send_movie(bot: Bot, chat_id: int, movie: Movie, idx: str = 0) -> None:
+async def with_poster(
+    item: Movie | Serie,
+    context: str,
+    send: Callable[[str], Awaitable[Message | bool]],
+    file_id: str | None = None,
+) -> Message | bool:
+    """Call ``send`` with the poster of ``item``, reusing its ``file_id`` if known.
+
+    New uploads use the TMDB image size configured for ``context`` and the
+    ``file_id`` Telegram gives back is cached for the next time. A ``file_id``
+    already looked up (by the prefetcher) saves the cache lookup.
+    """
+    url = images.poster_url(item, context)
+    path = item.poster_path or item.backdrop_path
+    if not path:
+        return await send(url)
+
+    file_id = file_id or await posters.get(path)
+    if file_id:
+        try:
+            return await send(file_id)
+        except error.BadRequest:
+            log.warning("Cached poster %s was rejected, uploading it again", path)
+            await posters.delete(path)
+
+    message = await send(url)
+    if isinstance(message, Message) and message.photo:
+        await posters.set(path, message.photo[-1].file_id)
+    return message
+
+
+async def send_poster(
+    bot: Bot,
+    chat_id: int,
+    item: Movie | Serie,
+    caption: str,
+    context: str = "card",
+    reply_markup: InlineKeyboardMarkup | None = None,
+) -> Message:
+    async def send(photo: str) -> Message:
+        return await send_photo(bot, chat_id, photo, caption, reply_markup)
+
+    return await with_poster(item, context, send)  # type: ignore
+
+
+def movie_caption(movie: Movie) -> str:
+    if movie.id in library:
+        return f"{movie}\nAlready in the library"
+    return str(movie)
+
+
+def result_caption(item: Movie | Serie) -> str:
+    if isinstance(item, Serie):
+        return str(item)
+    return movie_caption(item)
+
+
+async def send_card(
+    bot: Bot,
+    chat_id: int,
+    item: Movie | Serie,
+    idx: int = 0,
+    search_id: str | None = None,
+) -> None:
+    """Send a result as one message: poster, caption and buttons together.
+
+    "Next" then swaps the same message in place with ``edit_card``.
+    """
+    caption = result_caption(item)
+    reply_markup = result_buttons(item, idx, search_id)
     try:
-        await send_photo(
-            bot,
-            chat_id,
-            movie.poster,
-            caption=str(movie),
-        )
+        await send_poster(bot, chat_id, item, caption, reply_markup=reply_markup)
     except Exception:
         log.exception("Error while sending photo")
-        await send_message(bot, chat_id, str(movie))
+        await bot.send_message(
+            chat_id=chat_id,
+            text=caption,
+            reply_markup=reply_markup,
+            disable_notification=True,
+        )
+
 
-    await send_buttons(bot, chat_id, "Is this the movie?", movie_id=movie.id, idx=idx)
+async def edit_card(
+    query: CallbackQuery,
+    item: Movie | Serie,
+    idx: int,
+    search_id: str,
+    file_id: str | None = None,
+) -> None:
+    """Swap the card ``query`` came from for result ``idx``.
 
+    A text message, such as the keyboard under an album, cannot be edited into
+    a photo, so the result is sent as a new card instead.
+    """
+    if not query.message.photo:  # type: ignore
+        chat_id = query.message.chat_id  # type: ignore
+        await send_card(query.get_bot(), chat_id, item, idx, search_id)
+        return
+
+    caption = result_caption(item)
+    reply_markup = result_buttons(item, idx, search_id)
+
+    async def edit(photo: str) -> Message | bool:
+        media = InputMediaPhoto(photo, caption=caption)
+        return await query.edit_message_media(media, reply_markup=reply_markup)
 
-async def send_serie(bot: Bot, chat_id: int, serie: Serie, idx: int = 0) -> None:
     try:
-        await send_photo(
-            bot,
-            chat_id,
-            serie.poster,
-            caption=str(serie),
+        await with_poster(item, "card", edit, file_id)
+    except error.BadRequest:
+        log.exception("Error while editing photo")
+        await query.edit_message_caption(caption=caption, reply_markup=reply_markup)
+
+
+async def edit_query_message(query: CallbackQuery, text: str) -> None:
+    """Replace the text of the message with the buttons, or its caption."""
+    if query.message.photo:  # type: ignore
+        await query.edit_message_caption(caption=text)
+    else:
+        await query.edit_message_text(text=text)
+
+
+def album_captions(items: Sequence[Movie | Serie]) -> list[str]:
+    return [f"{n}. {result_caption(item)}" for n, item in enumerate(items, 1)]
+
+
+def album_buttons(
+    items: Sequence[Movie | Serie], search_id: str | None = None
+) -> InlineKeyboardMarkup:
+    """One numbered Confirm button per album item, plus "Next" past the album."""
+    buttons = []
+    for n, item in enumerate(items, 1):
+        kind = "serie_id" if isinstance(item, Serie) else "movie_id"
+        data = json.dumps({kind: item.id})
+        buttons.append(InlineKeyboardButton(str(n), callback_data=data))
+    rows = [buttons]
+    if search_id:
+        data = json.dumps({"idx": len(items), "sid": search_id})
+        rows.append([InlineKeyboardButton("Next", callback_data=data)])
+    return InlineKeyboardMarkup(rows)
+
+
+async def send_album(
+    bot: Bot,
+    chat_id: int,
+    items: Sequence[Movie | Serie],
+    search_id: str | None = None,
+) -> None:
+    """Send ``items`` as one media group and a keyboard to pick among them.
+
+    Two API calls whatever the size of the album. Posters already uploaded
+    are sent by ``file_id``, and the ``file_id``s of new ones are cached.
+    """
+    captions = album_captions(items)
+    paths = [item.poster_path or item.backdrop_path for item in items]
+    cached = [path for path in paths if path]
+    file_ids = await posters.get_many(cached)
+    known = {path: file_id for path, file_id in zip(cached, file_ids) if file_id}
+
+    def build_media(use_cache: bool) -> list[InputMediaPhoto]:
+        return [
+            InputMediaPhoto(
+                (use_cache and path and known.get(path))
+                or images.poster_url(item, "album"),
+                caption=caption,
+            )
+            for item, path, caption in zip(items, paths, captions)
+        ]
+
+    try:
+        try:
+            messages = await bot.send_media_group(
+                chat_id, build_media(True), disable_notification=True
+            )
+        except error.BadRequest:
+            if not known:
+                raise
+            log.warning("Cached posters were rejected, uploading them again")
+            messages = await bot.send_media_group(
+                chat_id, build_media(False), disable_notification=True
+            )
+            known.clear()
+        await posters.set_many(
+            {
+                path: message.photo[-1].file_id
+                for path, message in zip(paths, messages)
+                if path and message.photo and path not in known
+            }
         )
+        text = "Which one?"
+    except Exception:
+        log.exception("Error while sending album")
+        text = "\n\n".join(captions)
+
+    await bot.send_message(
+        chat_id=chat_id,
+        text=text,
+        reply_markup=album_buttons(items, search_id),
+        disable_notification=True,
+    )
+
+
+async def send_results(
+    bot: Bot,
+    chat_id: int,
+    items: list[Movie] | list[Serie],
+    search_id: str | None = None,
+) -> int:
+    """Send the first results of a search, returning how many were shown."""
+    if settings.SEARCH_ALBUM_SIZE > 1 and len(items) > 1:
+        album = items[: settings.SEARCH_ALBUM_SIZE]
+        await send_album(bot, chat_id, album, search_id)
+        return len(album)
+    await send_result(bot, chat_id, items[0], search_id=search_id)
+    return 1
+
+
+async def send_result(
+    bot: Bot,
+    chat_id: int,
+    item: Movie | Serie,
+    idx: int = 0,
+    search_id: str | None = None,
+) -> None:
+    if settings.SEARCH_CAROUSEL:
+        await send_card(bot, chat_id, item, idx, search_id)
+    elif isinstance(item, Serie):
+        await send_serie(bot, chat_id, item, idx, search_id)
+    else:
+        await send_movie(bot, chat_id, item, idx, search_id)
+
+
+async def send_movie(
+    bot: Bot, chat_id: int, movie: Movie, idx: int = 0, search_id: str | None = None
+) -> None:
+    caption = movie_caption(movie)
+    try:
+        await send_poster(bot, chat_id, movie, caption=caption)
+    except Exception:
+        log.exception("Error while sending photo")
+        await send_message(bot, chat_id, caption)
+
+    await send_buttons(
+        bot,
+        chat_id,
+        "Is this the movie?",
+        movie_id=movie.id,
+        idx=idx,
+        search_id=search_id,
+    )
+
+
+async def send_serie(
+    bot: Bot, chat_id: int, serie: Serie, idx: int = 0, search_id: str | None = None
+) -> None:
+    try:
+        await send_poster(bot, chat_id, serie, caption=str(serie))
     except Exception:
         log.exception("Error while sending photo")
         await send_message(bot, chat_id, str(serie))
 
-    await send_buttons(bot, chat_id, "Is this the serie?", serie_id=serie.id, idx=idx)
+    await send_buttons(
+        bot,
+        chat_id,
+        "Is this the serie?",
+        serie_id=serie.id,
+        idx=idx,
+        search_id=search_id,
+    )
 
 
 async def post_init(application: Application) -> None:
+    await tmdb_api.client.start()
+    await radarr_api.client.start()
+    await redis_pool.start()
+
+    try:
+        await tmdb_api.load_image_configuration()
+    except Exception:
+        log.exception("Could not load the TMDB configuration, using default sizes")
+
+    try:
+        await library.sync()
+    except Exception:
+        log.exception("Could not sync the Radarr library")
+    await add_jobs.start(application.bot)
+
+    register_collectors(application, prefetcher, pages)
+    if settings.METRICS_PORT:
+        try:
+            await metrics_server.start()
+        except OSError:
+            # an optional exporter must not keep the bot from starting
+            log.warning("Could not serve metrics", exc_info=True)
+    interval = settings.RADARR_LIBRARY_SYNC_INTERVAL
+    application.job_queue.run_repeating(  # type: ignore
+        sync_library, interval=interval, first=interval
+    )
+
     bot = application.bot
     await bot.send_chat_action(
         action=ChatAction.TYPING, chat_id=settings.TELEGRAM_EDUZEN_ID
     )
     await send_message(bot, settings.TELEGRAM_EDUZEN_ID, "Bot started!")
+
+
+async def post_shutdown(application: Application) -> None:
+    await prefetcher.close()
+    await metrics_server.close()
+    await add_jobs.close()
+    await tmdb_api.client.close()
+    await radarr_api.client.close()
+    await redis_pool.close()
@@ -0,0 +1,181 @@
+"""Webhook mode: Telegram POSTs updates to a small ASGI app.
+
+``WebhookApp`` is a plain ASGI callable with no web framework behind it. It
+checks the ``X-Telegram-Bot-Api-Secret-Token`` header, always: without a
+``WEBHOOK_SECRET`` a random one is generated and registered with Telegram at
+startup. Then it turns the body into an
+``Update`` and puts it on the application's ``update_queue``, where the update
+processor picks it up as in polling mode.
+
+Backpressure comes from the queue: it is bounded (``WEBHOOK_MAX_QUEUE``) and a
+request waits up to ``WEBHOOK_QUEUE_TIMEOUT`` for room. If there is still none
+it answers 503, and Telegram keeps the update and delivers it again later, so
+a burst slows delivery down instead of losing updates.
+
+The ASGI lifespan runs the same ``post_init``/``post_shutdown`` hooks as
+``run_polling`` and registers the webhook with Telegram. Serving it needs an
+ASGI server, ``uvicorn`` from the ``webhook`` extra is used by ``run_webhook``.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from telegram import Update
+from telegram.ext import Application
+
+from rbot.conf import settings
+from rbot.metrics import WebhookStats
+
+log = logging.getLogger(__name__)
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+# Telegram updates are a few KiB at most
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class WebhookApp:
+    def __init__(
+        self,
+        application: Application,
+        path: str = settings.WEBHOOK_PATH,
+        secret: str = settings.WEBHOOK_SECRET,
+        queue_timeout: float = settings.WEBHOOK_QUEUE_TIMEOUT,
+    ) -> None:
+        self.application = application
+        self.path = path
+        # the webhook is registered at every startup, so a random one works
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.queue_timeout = queue_timeout
+        self.stats = WebhookStats()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            status = await self.handle(scope, receive)
+            await respond(send, status)
+        elif scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+
+    async def handle(self, scope: Scope, receive: Receive) -> int:
+        if scope["path"] == "/healthz":
+            return 200
+        if scope["path"] != self.path:
+            return 404
+        if scope["method"] != "POST":
+            return 405
+
+        headers = dict(scope["headers"])
+        token = headers.get(SECRET_HEADER, b"")
+        if not secrets.compare_digest(token, self.secret.encode()):
+            self.stats.unauthorized += 1
+            return 403
+
+        body = await read_body(receive)
+        if body is None:
+            self.stats.invalid += 1
+            return 413
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except (AttributeError, TypeError, ValueError):
+            self.stats.invalid += 1
+            log.warning("Invalid webhook update: %r", body[:200])
+            return 400
+        if update is None:
+            self.stats.invalid += 1
+            return 400
+
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self.application.update_queue.put(update)
+        except TimeoutError:
+            self.stats.throttled += 1
+            log.warning("Update queue full, asking Telegram to retry later")
+            return 503
+        self.stats.accepted += 1
+        return 200
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    log.exception("Could not start the webhook")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self) -> None:
+        application = self.application
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.bot.set_webhook(
+            url=settings.WEBHOOK_URL + self.path,
+            secret_token=self.secret,
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        await application.start()
+        log.info("Webhook listening on %s", settings.WEBHOOK_URL + self.path)
+
+    async def shutdown(self) -> None:
+        # the webhook stays registered: Telegram holds updates until we are back
+        application = self.application
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        log.info("Webhook stopped: %r", self.stats)
+
+
+async def read_body(receive: Receive) -> bytes | None:
+    """The request body, or None as soon as it is larger than ``MAX_BODY_SIZE``."""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_SIZE:
+            return None
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def respond(send: Send, status: int) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-length", b"0")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b""})
+
+
+def run_webhook(application: Application) -> None:
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Webhook mode needs uvicorn: pip install 'rbot[webhook]'")
+
+    uvicorn.run(
+        WebhookApp(application),
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        log_config=None,
+    )
@@ -0,0 +1,22 @@
+from typing import Any
+
+import pytest
+from fakeredis import aioredis
+
+from rbot.storage.models import Movie
+from rbot.storage.redis import pool
+
+
+def make_movie(idx: int = 603, **fields: Any) -> Movie:
+    fields.setdefault("title", f"Movie {idx}")
+    fields.setdefault("release_date", "1999-03-31")
+    return Movie(id=idx, vote_average=8.1, **fields)
+
+
+@pytest.fixture
+async def fake_redis():
+    client = aioredis.FakeRedis()
+    pool._client = client
+    yield client
+    pool._client = None
+    await client.aclose()
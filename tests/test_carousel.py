@@ -0,0 +1,57 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from rbot import utils
+from rbot.storage.models import Movie
+from rbot.utils import album_buttons, edit_card, edit_query_message, result_buttons
+
+movie = Movie(id=603, title="The Matrix", release_date="1999-03-30", vote_average=8.2)
+
+
+def test_result_buttons_point_next_to_the_following_result():
+    markup = result_buttons(movie, idx=2, search_id="abcd1234")
+
+    confirm, next_ = markup.inline_keyboard[0]
+    assert json.loads(confirm.callback_data) == {"movie_id": 603}
+    assert json.loads(next_.callback_data) == {"idx": 3, "sid": "abcd1234"}
+
+
+@pytest.mark.asyncio
+async def test_edit_card_sends_a_new_card_under_text_messages(monkeypatch):
+    send_card = AsyncMock()
+    monkeypatch.setattr(utils, "send_card", send_card)
+    query = MagicMock()
+    query.message.photo = ()
+    query.message.chat_id = 1
+    query.edit_message_text = AsyncMock()
+
+    await edit_card(query, movie, 1, "abcd1234")
+
+    send_card.assert_awaited_once_with(query.get_bot(), 1, movie, 1, "abcd1234")
+    query.edit_message_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_edit_query_message_uses_the_caption_of_photos():
+    query = MagicMock()
+    query.message.photo = ("photo",)
+    query.edit_message_caption = AsyncMock()
+
+    await edit_query_message(query, "Movie has been added!")
+
+    query.edit_message_caption.assert_awaited_once_with(caption="Movie has been added!")
+
+
+def test_album_buttons_number_each_result():
+    other = Movie(
+        id=604, title="The Matrix Reloaded", release_date="2003-05-15", vote_average=7.0
+    )
+
+    markup = album_buttons([movie, other], search_id="abcd1234")
+
+    picks, (next_,) = markup.inline_keyboard
+    assert [button.text for button in picks] == ["1", "2"]
+    assert json.loads(picks[1].callback_data) == {"movie_id": 604}
+    assert json.loads(next_.callback_data) == {"idx": 2, "sid": "abcd1234"}
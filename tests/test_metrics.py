@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rbot import monitoring
+from rbot.metrics import Histogram, QueueStats, Registry, counter, gauge, registry, span
+from rbot.monitoring import MetricsServer, register_collectors
+from rbot.prefetch import Prefetcher
+from rbot.singleflight import SingleFlight
+
+
+def test_histogram_counts_values_in_their_bucket():
+    histogram = Histogram((0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_span_counts_errors_but_not_cancellations():
+    histogram = Histogram()
+
+    with span(histogram):
+        pass
+    with pytest.raises(ValueError), span(histogram):
+        raise ValueError
+    with pytest.raises(asyncio.CancelledError), span(histogram):
+        raise asyncio.CancelledError
+
+    assert histogram.count == 3
+    assert histogram.errors == 1
+
+
+def test_registry_renders_cumulative_buckets_and_collectors():
+    registry = Registry()
+    family = registry.histogram("rbot_test", "Test", "handler", buckets=(0.1, 1.0))
+    family.labels("search").observe(0.05)
+    family.labels("search").observe(0.5, error=True)
+    registry.collector(lambda: gauge("rbot_depth", "Depth", {"updates": 3}, "queue"))
+    registry.collector(lambda: gauge("rbot_depth", "Depth", {"updates": 4}, "queue"))
+
+    lines = registry.render().splitlines()
+
+    assert 'rbot_test_seconds_bucket{handler="search",le="0.1"} 1' in lines
+    assert 'rbot_test_seconds_bucket{handler="search",le="1.0"} 2' in lines
+    assert 'rbot_test_seconds_bucket{handler="search",le="+Inf"} 2' in lines
+    assert 'rbot_test_seconds_count{handler="search"} 2' in lines
+    assert 'rbot_test_errors_total{handler="search"} 1' in lines
+    # registered again under the same name: replaced, not duplicated
+    assert lines.count("# TYPE rbot_depth gauge") == 1
+    assert 'rbot_depth{queue="updates"} 4.0' in lines
+
+
+def test_counters_are_typed_as_counters():
+    lines = list(counter("rbot_jobs_total", "Jobs", {"done": 2}, "outcome"))
+
+    assert lines[1] == "# TYPE rbot_jobs_total counter"
+    assert lines[2] == 'rbot_jobs_total{outcome="done"} 2.0'
+
+
+async def scrape(port: int, path: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_the_registry():
+    server = MetricsServer("127.0.0.1", 0)
+    await server.start()
+    try:
+        response = await scrape(server.port, "/metrics")
+        missing = await scrape(server.port, "/")
+    finally:
+        await server.close()
+
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b"text/plain; version=0.0.4" in response
+    assert b"# TYPE rbot_handler_seconds histogram" in response
+    assert missing.startswith(b"HTTP/1.1 404")
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_drops_a_silent_connection(monkeypatch):
+    monkeypatch.setattr(monitoring, "READ_TIMEOUT", 0.01)
+    server = MetricsServer("127.0.0.1", 0)
+    await server.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        async with asyncio.timeout(1):
+            assert await reader.read() == b""
+        writer.close()
+    finally:
+        await server.close()
+
+
+def test_collectors_export_the_resilience_layers():
+    application = SimpleNamespace(
+        update_processor=SimpleNamespace(stats=QueueStats()),
+        bot=SimpleNamespace(rate_limiter=SimpleNamespace(queue=QueueStats())),
+    )
+    register_collectors(application, Prefetcher(), SingleFlight())  # type: ignore
+
+    lines = registry.render().splitlines()
+    # other tests may have used the singletons, only the samples are checked
+    samples = {line.rsplit(" ", 1)[0] for line in lines}
+
+    assert "# TYPE rbot_http_retries_total counter" in lines
+    assert 'rbot_http_requests_total{backend="tmdb"}' in samples
+    assert "# TYPE rbot_circuit_breaker_opened_total counter" in lines
+    assert 'rbot_singleflight_deduplicated_total{flight="tmdb"}' in samples
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from rbot import utils
+from rbot.storage.models import Movie, Page
+from rbot.storage.sessions import create_session, read_session_cursor
+from tests.conftest import make_movie
+
+
+@pytest.fixture
+def tmdb_pages(monkeypatch):
+    requested = []
+
+    async def search_movie_page(query: str, page: int = 1) -> Page[Movie]:
+        requested.append(page)
+        results = [make_movie(page * 10 + i) for i in range(2)]
+        return Page[Movie](results=results, page=page, total_pages=3)
+
+    monkeypatch.setattr(utils.tmdb_api, "search_movie_page", search_movie_page)
+    return requested
+
+
+@pytest.mark.asyncio
+async def test_next_loads_the_following_page_on_demand(fake_redis, tmdb_pages):
+    search_id = await create_session(1, [make_movie(10), make_movie(11)], "x", 3)
+
+    idx, movie, _ = await utils.show_next_movie(1, {"idx": 2, "sid": search_id})
+
+    assert (idx, movie.id) == (2, 20)
+    await asyncio.gather(*utils.background_tasks)
+    assert tmdb_pages == [2, 3]
+    assert (await read_session_cursor(1, search_id)).total_results == 6
+
+
+@pytest.mark.asyncio
+async def test_next_stops_after_the_last_page(fake_redis, tmdb_pages):
+    search_id = await create_session(1, [make_movie(10)], "x", 1)
+
+    assert await utils.show_next_movie(1, {"idx": 1, "sid": search_id}) is None
+    assert tmdb_pages == []
+
+
+@pytest.mark.asyncio
+async def test_next_raises_when_the_search_expired(fake_redis, tmdb_pages):
+    with pytest.raises(utils.SearchExpired):
+        await utils.show_next_movie(1, {"idx": 1, "sid": "gone"})
+    with pytest.raises(utils.SearchExpired):
+        await utils.show_next_movie(1, {"idx": 1})
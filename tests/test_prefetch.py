@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from rbot.prefetch import Prefetcher
+from rbot.singleflight import SingleFlight
+
+
+async def warm(value: str) -> str:
+    return value
+
+
+async def wait_for(prefetcher: Prefetcher) -> None:
+    await asyncio.gather(*prefetcher._tasks.values())
+
+
+@pytest.mark.asyncio
+async def test_take_returns_the_prefetched_value_once():
+    prefetcher = Prefetcher(concurrency=2)
+    prefetcher.schedule(1, ("sid", 1), warm, "next")
+    await wait_for(prefetcher)
+
+    assert prefetcher.take(1, ("sid", 2)) is None
+    assert prefetcher.take(1, ("sid", 1)) == "next"
+    assert prefetcher.take(1, ("sid", 1)) is None
+    assert prefetcher.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduling_again_cancels_the_previous_prefetch_of_the_chat():
+    started = asyncio.Event()
+
+    async def slow() -> str:
+        started.set()
+        await asyncio.sleep(10)
+        return "never"
+
+    prefetcher = Prefetcher(concurrency=2)
+    prefetcher.schedule(1, ("sid", 1), slow)
+    await started.wait()
+    prefetcher.schedule(1, ("sid", 2), warm, "second")
+    await wait_for(prefetcher)
+
+    assert prefetcher.take(1, ("sid", 2)) == "second"
+    assert prefetcher.stats.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_unused_prefetches_are_counted_as_wasted():
+    prefetcher = Prefetcher(concurrency=2, maxsize=1)
+    prefetcher.schedule(1, ("a", 1), warm, "a")
+    await wait_for(prefetcher)
+    prefetcher.schedule(2, ("b", 1), warm, "b")
+    await wait_for(prefetcher)
+    prefetcher.cancel(2)
+
+    assert len(prefetcher) == 0
+    assert prefetcher.stats.wasted == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_prefetch_does_not_fail_a_handler_sharing_its_flight():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def movie_detail() -> str:
+        started.set()
+        await asyncio.sleep(0.01)
+        return "detail"
+
+    async def warm_detail() -> str:
+        return await flight.do("movie:603", movie_detail)
+
+    prefetcher = Prefetcher(concurrency=2)
+    prefetcher.schedule(1, ("sid", 1), warm_detail)
+    await started.wait()
+    handler = asyncio.create_task(flight.do("movie:603", movie_detail))
+    await asyncio.sleep(0)
+    prefetcher.cancel(1)  # chat 1 pressed Confirm
+
+    assert await handler == "detail"
+    assert prefetcher.stats.cancelled == 1
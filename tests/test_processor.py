@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from telegram import Chat, Message, Update
+
+from rbot.processor import ChatOrderedUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(id=chat_id, type=Chat.PRIVATE)
+    message = Message(message_id=update_id, date=None, chat=chat)  # type: ignore
+    return Update(update_id=update_id, message=message)
+
+
+@pytest.mark.asyncio
+async def test_updates_of_one_chat_run_in_order_and_other_chats_overlap():
+    processor = ChatOrderedUpdateProcessor(workers=4, max_pending=16)
+    events = []
+
+    async def handle(name: str, delay: float) -> None:
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+
+    await asyncio.gather(
+        processor.process_update(make_update(1, 1), handle("a1", 0.02)),
+        processor.process_update(make_update(2, 1), handle("a2", 0)),
+        processor.process_update(make_update(3, 2), handle("b1", 0)),
+    )
+
+    assert events.index("end a1") < events.index("start a2")
+    assert events.index("end b1") < events.index("end a1")
+    assert processor.stats.wait.count == 3
+    assert processor.stats.max_pending == 2  # a1 started right away
+    assert (processor.stats.pending, processor.stats.running) == (0, 0)
+    assert not processor._locks
+
+
+@pytest.mark.asyncio
+async def test_workers_bound_concurrency_across_chats():
+    processor = ChatOrderedUpdateProcessor(workers=1, max_pending=16)
+    running = 0
+    peak = 0
+
+    async def handle() -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+
+    await asyncio.gather(
+        *(processor.process_update(make_update(i, i), handle()) for i in range(5))
+    )
+
+    assert peak == 1
+
+
+def test_processor_needs_at_least_one_worker():
+    with pytest.raises(ValueError):
+        ChatOrderedUpdateProcessor(workers=0)
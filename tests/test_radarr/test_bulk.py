@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+
+from rbot.radarr.bulk import BulkProgress, bulk_add, parse_ids
+from rbot.radarr.jobs import AddJobQueue
+
+
+@pytest.mark.parametrize(
+    "text, ids",
+    [
+        ("603 604, 605;603", ["603", "604", "605"]),
+        ("603\n604\n\nnot-an-id\n", ["603", "604"]),
+        ("title,year,tmdbId\nThe Matrix,1999,603\nReloaded,2003,604\n", ["603", "604"]),
+        ("", []),
+    ],
+)
+def test_parse_ids(text, ids):
+    assert parse_ids(text) == ids
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_skips_owned_titles_and_bounds_concurrency(fake_redis):
+    running = 0
+    peak = 0
+    added = []
+
+    async def add(tmdb_id: str) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        if tmdb_id == "13":
+            raise KeyError("title")
+        added.append(tmdb_id)
+
+    reports: list[str] = []
+
+    async def report(progress: BulkProgress) -> None:
+        reports.append(str(progress))
+
+    ids = [str(i) for i in range(100)]
+    owned = {"1", "2", "3"}
+    progress = await bulk_add(
+        ids, report, concurrency=5, interval=60, library=owned, add=add
+    )
+
+    assert peak == 5
+    assert (progress.added, progress.skipped, progress.failed) == (96, 3, 1)
+    assert progress.queued == 0
+    assert sorted(added, key=int) == [i for i in ids if i not in owned | {"13"}]
+    # only the final report fits in a 60 s throttle window
+    assert reports == [str(progress)]
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_retries_transient_failures(fake_redis):
+    calls = []
+
+    async def add(tmdb_id: str) -> None:
+        calls.append(tmdb_id)
+        if len(calls) == 1:
+            raise httpx.ReadTimeout("slow NAS")
+
+    async def report(progress: BulkProgress) -> None:
+        pass
+
+    jobs = AddJobQueue(backoff=0)
+    progress = await bulk_add(["603"], report, library=set(), add=add, jobs=jobs)
+
+    assert calls == ["603", "603"]
+    assert progress.added == 1
+    # the reservation is released once the title is added
+    assert await jobs.reserve("movie", "603")
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_leaves_queued_titles_to_their_add_job(fake_redis):
+    calls = []
+
+    async def add(tmdb_id: str) -> None:
+        calls.append(tmdb_id)
+
+    async def report(progress: BulkProgress) -> None:
+        pass
+
+    jobs = AddJobQueue()
+    await jobs.reserve("movie", "603")
+    progress = await bulk_add(["603", "604"], report, library=set(), add=add, jobs=jobs)
+
+    assert calls == ["604"]
+    assert (progress.added, progress.queued) == (1, 1)
@@ -0,0 +1,189 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from rbot import utils
+from rbot.radarr.jobs import AddJobQueue, is_retryable
+
+
+async def wait_until(condition) -> None:
+    async with asyncio.timeout(5):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def make_bot() -> MagicMock:
+    bot = MagicMock()
+    bot.edit_message_text = AsyncMock()
+    bot.edit_message_caption = AsyncMock()
+    return bot
+
+
+def test_only_transient_failures_are_retried():
+    request = httpx.Request("POST", "http://radarr/movie")
+    unavailable = httpx.Response(503, request=request)
+    bad_request = httpx.Response(400, request=request)
+
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert is_retryable(
+        httpx.HTTPStatusError("", request=request, response=unavailable)
+    )
+    assert not is_retryable(
+        httpx.HTTPStatusError("", request=request, response=bad_request)
+    )
+    assert not is_retryable(KeyError("title"))
+
+
+@pytest.mark.asyncio
+async def test_a_title_is_only_queued_once(fake_redis):
+    queue = AddJobQueue(workers=1, key="test:jobs")
+
+    assert await queue.reserve("movie", "603")
+    assert not await queue.reserve("movie", "603")
+    assert await queue.reserve("serie", "603")
+    assert queue.stats.duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_retry_and_report_the_outcome(fake_redis):
+    calls = []
+
+    async def add_movie(tmdb_id: str) -> None:
+        calls.append(tmdb_id)
+        if len(calls) == 1:
+            raise httpx.ConnectError("NAS is asleep")
+
+    queue = AddJobQueue(workers=1, backoff=0.001, key="test:jobs")
+    queue.adders = {"movie": add_movie}
+    bot = make_bot()
+    await queue.start(bot)
+    try:
+        await queue.reserve("movie", "603")
+        await queue.push("movie", "603", chat_id=1, message_id=10, caption=True)
+        await wait_until(lambda: queue.stats.done == 1)
+        assert await fake_redis.xlen("test:jobs") == 0
+        # released once added: confirming again is up to the library check
+        assert await queue.reserve("movie", "603")
+    finally:
+        await queue.close()
+
+    assert calls == ["603", "603"]
+    assert queue.stats.retries == 1
+    bot.edit_message_caption.assert_awaited_once_with(
+        chat_id=1, message_id=10, caption="Movie has been added!"
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_jobs_release_their_reservation(fake_redis):
+    async def add_movie(tmdb_id: str) -> None:
+        raise KeyError("title")
+
+    queue = AddJobQueue(workers=1, key="test:jobs")
+    queue.adders = {"movie": add_movie}
+    bot = make_bot()
+    await queue.start(bot)
+    try:
+        await queue.reserve("movie", "603")
+        await queue.push("movie", "603", chat_id=1, message_id=10, caption=False)
+        await wait_until(lambda: queue.stats.failed == 1)
+        assert await queue.reserve("movie", "603")
+    finally:
+        await queue.close()
+
+    bot.edit_message_text.assert_awaited_once_with(
+        "Movie has not been added!", chat_id=1, message_id=10
+    )
+
+
+@pytest.mark.asyncio
+async def test_throughput_scales_with_the_workers(fake_redis):
+    running = 0
+    peak = 0
+
+    async def add_movie(tmdb_id: str) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    queue = AddJobQueue(workers=4, key="test:jobs")
+    queue.adders = {"movie": add_movie}
+    for tmdb_id in range(8):
+        await queue.push("movie", str(tmdb_id), chat_id=1, message_id=1, caption=False)
+    await queue.start(make_bot())
+    try:
+        await wait_until(lambda: queue.stats.done == 8)
+    finally:
+        await queue.close()
+
+    assert peak == 4
+
+
+@pytest.mark.asyncio
+async def test_a_worker_survives_a_job_it_could_not_finish(fake_redis):
+    async def add_movie(tmdb_id: str) -> None:
+        pass
+
+    queue = AddJobQueue(workers=1, key="test:jobs")
+    queue.adders = {"movie": add_movie}
+    bot = make_bot()
+    bot.edit_message_text.side_effect = [RuntimeError("redis hiccup"), None]
+    await queue.start(bot)
+    try:
+        await queue.push("movie", "603", chat_id=1, message_id=10, caption=False)
+        await queue.push("movie", "604", chat_id=1, message_id=11, caption=False)
+        await wait_until(lambda: queue.stats.done == 1)
+        # the first one is still pending, to be read again
+        assert (await fake_redis.xpending("test:jobs", "rbot"))["pending"] == 1
+    finally:
+        await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_a_dead_worker_are_reclaimed(fake_redis, monkeypatch):
+    monkeypatch.setattr("rbot.radarr.jobs.CLAIM_IDLE_MS", 0)
+    calls = []
+
+    async def add_movie(tmdb_id: str) -> None:
+        calls.append(tmdb_id)
+
+    queue = AddJobQueue(workers=1, key="test:jobs")
+    queue.adders = {"movie": add_movie}
+    await fake_redis.xgroup_create("test:jobs", "rbot", id="0", mkstream=True)
+    await queue.push("movie", "603", chat_id=1, message_id=10, caption=False)
+    # delivered to a worker of a previous run that died before finishing it
+    await fake_redis.xreadgroup("rbot", "dead", {"test:jobs": ">"}, count=1)
+
+    await queue.start(make_bot())
+    try:
+        await wait_until(lambda: queue.stats.done == 1)
+    finally:
+        await queue.close()
+
+    assert calls == ["603"]
+    assert queue.stats.reclaimed == 1
+
+
+@pytest.mark.asyncio
+async def test_confirm_adds_inline_when_the_queue_is_unreachable(monkeypatch):
+    async def unreachable(kind: str, tmdb_id: str) -> bool:
+        raise RedisConnectionError("redis is restarting")
+
+    monkeypatch.setattr(utils.settings, "ADD_JOB_WORKERS", 4)
+    monkeypatch.setattr(utils.add_jobs, "reserve", unreachable)
+    monkeypatch.setattr(
+        utils.radarr_api, "add_movie_to_radarr", AsyncMock(return_value="Added!")
+    )
+    query = MagicMock()
+    query.message.photo = ()
+    query.get_bot.return_value.send_chat_action = AsyncMock()
+    query.edit_message_text = AsyncMock()
+
+    await utils.confirm(query, {"movie_id": "603"})
+
+    query.edit_message_text.assert_awaited_once_with(text="Added!")
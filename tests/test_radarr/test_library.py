@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import pytest
+
+from rbot.radarr import api as radarr_api
+from rbot.radarr.library import Library
+
+
+def make_item(radarr_id: int, tmdb_id: int, **extra) -> dict:
+    item = {
+        "id": radarr_id,
+        "tmdbId": tmdb_id,
+        "title": f"Movie {tmdb_id}",
+        "year": 1999,
+        "ratings": {"imdb": {"value": 7.5}},
+        "hasFile": False,
+    }
+    item.update(extra)
+    return item
+
+
+def test_library_membership():
+    library = Library()
+    library.apply([make_item(1, 603), make_item(2, 604)])
+
+    assert len(library) == 2
+    assert 603 in library
+    assert "604" in library
+    assert "champagne" not in library
+    assert library.get(605) is None
+    assert library.get("603").tmdb_id == 603
+
+
+def test_library_applies_only_changes():
+    library = Library()
+    assert library.apply([make_item(1, 603), make_item(2, 604)]) == (2, 0, 0)
+    assert library.version == 1
+
+    assert library.apply([make_item(1, 603), make_item(2, 604)]) == (0, 0, 0)
+    assert library.version == 1
+
+    changes = library.apply([make_item(1, 603, hasFile=True), make_item(3, 605)])
+    assert changes == (1, 1, 1)
+    assert library.version == 2
+    assert 604 not in library
+    assert 605 in library
+
+
+@pytest.mark.asyncio
+async def test_library_sync_uses_conditional_requests(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=[make_item(1, 603)], headers={"ETag": '"v1"'})
+
+    client = radarr_api.RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+    monkeypatch.setattr(radarr_api, "client", client)
+    library = Library()
+
+    await library.sync()
+    await library.sync()
+    await client.close()
+
+    assert library.etag == '"v1"'
+    assert library.version == 1
+    assert 603 in library
+
+
+@pytest.mark.asyncio
+async def test_concurrent_library_syncs_share_one_request(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=[make_item(1, 603)])
+
+    client = radarr_api.RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+    monkeypatch.setattr(radarr_api, "client", client)
+    library = Library()
+
+    await asyncio.gather(library.sync(), library.sync())
+    await client.close()
+
+    assert len(requests) == 1
+    assert library.version == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_library_sync_is_not_marked_synced(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b'[{"id": 1, "tmdbId": 603')
+
+    client = radarr_api.RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+    monkeypatch.setattr(radarr_api, "client", client)
+    library = Library()
+
+    with pytest.raises(ValueError, match="Truncated"):
+        await library.sync()
+    await client.close()
+
+    assert library.synced_at is None
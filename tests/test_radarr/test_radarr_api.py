@@ -1,6 +1,11 @@
+import httpx
 import pytest
 
-from rbot.radarr.api import add_movie_to_radarr, get_movies_from_radarr
+from rbot.radarr.api import (
+    RadarrClient,
+    add_movie_to_radarr,
+    get_movies_from_radarr,
+)
 from rbot.storage.models import Movie
 
 
@@ -30,3 +35,24 @@ async def test_add_movie_to_radarr():
 async def test_add_movie_to_radarr_error():
     response = await add_movie_to_radarr(tmdb_id="champagne")
     assert response == "Movie has not been added!"
+
+
+@pytest.mark.asyncio
+async def test_radarr_client_records_endpoint_stats():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["X-Api-Key"] == "blah"
+        return httpx.Response(200, json={"title": "The Matrix", "year": 1999})
+
+    client = RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url,
+        headers={"X-Api-Key": "blah"},
+        transport=httpx.MockTransport(handler),
+    )
+
+    await client.movie_loookup("603")
+    await client.movie_loookup("603")
+    await client.close()
+
+    assert client.stats["movie/lookup/tmdb"].count == 2
+    assert client.stats["movie/lookup/tmdb"].errors == 0
@@ -0,0 +1,73 @@
+import json
+
+import httpx
+import pytest
+
+from rbot.radarr.api import RadarrClient
+from rbot.radarr.stream import iter_json_array
+
+ITEMS = [
+    {"id": 1, "title": "Amélie", "year": 2001, "ratings": {"imdb": {"value": 8.3}}},
+    {"id": 2, "title": "Ran [乱]", "year": 1985, "ratings": {"imdb": {"value": 8.2}}},
+    12345,
+    "a string, with ] and [",
+]
+
+
+async def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", (1, 2, 7, 64, 4096))
+async def test_iter_json_array_across_chunk_boundaries(size):
+    body = json.dumps(ITEMS, ensure_ascii=False, indent=1).encode()
+
+    result = [item async for item in iter_json_array(chunked(body, size))]
+
+    assert result == ITEMS
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", (b'{"id": 1}', b'[{"id": 1}, {"id"'))
+async def test_iter_json_array_rejects_invalid_bodies(body):
+    with pytest.raises(ValueError):
+        [item async for item in iter_json_array(chunked(body, 3))]
+
+
+@pytest.mark.asyncio
+async def test_iter_movies_from_radarr_skips_invalid_items():
+    items = ITEMS[:2] + [{"id": 3, "title": "No rating", "year": 2000}]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=chunked(json.dumps(items).encode(), 10))
+
+    client = RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+
+    movies = [movie async for movie in client.iter_movies_from_radarr()]
+    await client.close()
+
+    assert [movie.title for movie in movies] == ["Amélie", "Ran [乱]"]
+
+
+@pytest.mark.asyncio
+async def test_stopping_a_stream_early_is_not_an_error():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=chunked(json.dumps(ITEMS).encode(), 10))
+
+    client = RadarrClient(base_url="http://radarr.test/api/v3/")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+
+    movies = client.iter_movies_from_radarr()
+    await anext(movies)
+    await movies.aclose()
+    await client.close()
+
+    assert client.stats["movie"].count == 1
+    assert client.stats["movie"].errors == 0
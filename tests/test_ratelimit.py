@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+from rbot.ratelimit import SendScheduler
+
+
+@pytest.fixture
+async def scheduler():
+    scheduler = SendScheduler(global_rate=1000, chat_rate=20, chat_burst=1)
+    await scheduler.initialize()
+    yield scheduler
+    await scheduler.shutdown()
+
+
+def send(scheduler, endpoint, chat_id, log, name=None, priority=None, **data):
+    async def callback():
+        log.append(name or endpoint)
+        return True
+
+    data["chat_id"] = chat_id
+    return scheduler.process_request(callback, (), {}, endpoint, data, priority)
+
+
+@pytest.mark.asyncio
+async def test_each_chat_gets_its_own_bucket(scheduler):
+    log: list[str] = []
+    start = asyncio.get_running_loop().time()
+
+    await asyncio.gather(
+        *(send(scheduler, "sendMessage", 1, log, f"a{i}") for i in range(3)),
+        send(scheduler, "sendMessage", 2, log, "b0"),
+    )
+
+    # chat 1 is spaced at 20/s while chat 2 goes right away
+    assert log.index("b0") < log.index("a1")
+    assert asyncio.get_running_loop().time() - start >= 0.09
+    assert scheduler.queue.wait.count == 4
+    assert scheduler.queue.pending == scheduler.queue.running == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_requests_go_in_priority_order(scheduler):
+    log: list[str] = []
+    await send(scheduler, "sendMessage", 1, log, "first")
+
+    await asyncio.gather(
+        send(scheduler, "sendMessage", 1, log, "low", priority=5),
+        send(scheduler, "editMessageText", 1, log, "edit"),
+    )
+
+    assert log == ["first", "edit", "low"]
+
+
+@pytest.mark.asyncio
+async def test_redundant_typing_actions_are_coalesced(scheduler):
+    log: list[str] = []
+    for _ in range(3):
+        await send(scheduler, "sendChatAction", 1, log, action="typing")
+    await send(scheduler, "sendMessage", 1, log)
+    await send(scheduler, "sendChatAction", 1, log, action="typing")
+
+    assert log.count("sendChatAction") == 2
+    assert scheduler.stats.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_the_chat_and_retries(scheduler):
+    calls = 0
+
+    async def callback():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RetryAfter(0)
+        return {"ok": True}
+
+    result = await scheduler.process_request(
+        callback, (), {}, "sendMessage", {"chat_id": 1}, None
+    )
+
+    assert result == {"ok": True}
+    assert calls == 2
+    assert scheduler.stats.retry_after == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_that_are_not_messages_are_not_limited(scheduler):
+    log: list[str] = []
+    await asyncio.gather(
+        *(send(scheduler, "answerCallbackQuery", 1, log) for _ in range(5))
+    )
+
+    assert len(log) == 5
+    assert scheduler.queue.wait.count == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_actions_do_not_use_up_the_chat_bucket():
+    scheduler = SendScheduler(global_rate=1000, chat_rate=1, chat_burst=1)
+    log: list[str] = []
+    start = asyncio.get_running_loop().time()
+
+    await send(scheduler, "sendChatAction", 1, log, action="typing")
+    await send(scheduler, "sendPhoto", 1, log)
+    await scheduler.shutdown()
+
+    assert log == ["sendChatAction", "sendPhoto"]
+    assert asyncio.get_running_loop().time() - start < 0.5
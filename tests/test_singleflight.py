@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from rbot.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def lookup(tmdb_id):
+        calls.append(tmdb_id)
+        await asyncio.sleep(0.01)
+        return {"tmdbId": tmdb_id}
+
+    results = await asyncio.gather(*(flight.do(603, lookup, 603) for _ in range(5)))
+
+    assert calls == [603]
+    assert results == [{"tmdbId": 603}] * 5
+    assert flight.stats.calls == 5
+    assert flight.stats.deduplicated == 4
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_the_error():
+    flight = SingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        raise ValueError("radarr is down")
+
+    results = await asyncio.gather(
+        *(flight.do("key", lookup) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats.deduplicated == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    assert await leader == "done"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "done"
+    assert leader.cancelled()
+    assert len(flight) == 0
@@ -0,0 +1,57 @@
+import pytest
+
+from rbot.storage.models import Movie, Serie, parse_movies, parse_series, parse_year
+
+
+def test_parse_year():
+    assert parse_year("1999-03-31") == 1999
+    with pytest.raises(ValueError):
+        parse_year("")
+
+
+def test_parse_movies_skips_invalid_items(caplog):
+    results = [
+        {
+            "id": 603,
+            "title": "The Matrix",
+            "release_date": "1999-03-31",
+            "vote_average": 8.1,
+        },
+        {"id": 604, "title": "No rating", "release_date": "2003-05-07"},
+        {"id": 605, "title": "No date", "vote_average": 7.0},
+        {
+            "id": 606,
+            "title": "Ratings",
+            "year": 2003,
+            "ratings": {"imdb": {"value": 7}},
+        },
+    ]
+
+    movies = parse_movies(results)
+
+    assert [movie.id for movie in movies] == [603, 606]
+    assert movies[0].year == 1999
+    assert movies[1].vote_average == 7
+    assert "movie 604" in caplog.text
+    assert "movie 605" in caplog.text
+
+
+def test_parse_series():
+    results = [{"id": 1399, "name": "Game of Thrones", "first_air_date": "2011-04-17"}]
+    results.append({**results[0], "vote_average": 8.44})
+
+    series = parse_series(results)
+
+    assert len(series) == 1
+    assert series[0].year == 2011
+    assert series[0].vote_average == 8.4
+
+
+def test_models_roundtrip_through_json():
+    movie = Movie(
+        id=603, title="The Matrix", release_date="1999-03-31", vote_average=8.1
+    )
+    serie = Serie(id=1399, name="Game of Thrones", year=2011, vote_average=8.4)
+
+    assert Movie.model_validate_json(movie.model_dump_json()) == movie
+    assert Serie.model_validate_json(serie.model_dump_json()) == serie
@@ -0,0 +1,40 @@
+import pytest
+
+from rbot.storage.posters import PosterCache
+
+
+@pytest.mark.asyncio
+async def test_poster_cache_hits_and_misses(fake_redis):
+    cache = PosterCache(maxsize=10)
+
+    assert await cache.get("/poster.jpg") is None
+    await cache.set("/poster.jpg", "AgACAgQAAxkBAAI")
+
+    assert await cache.get("/poster.jpg") == "AgACAgQAAxkBAAI"
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_poster_cache_evicts_least_recently_used(fake_redis):
+    cache = PosterCache(maxsize=2)
+    await cache.set("/a.jpg", "a")
+    await cache.set("/b.jpg", "b")
+    await fake_redis.zadd(cache.lru_key, {"/a.jpg": 1, "/b.jpg": 0})
+
+    await cache.set("/c.jpg", "c")
+
+    assert await cache.get("/b.jpg") is None
+    assert await cache.get("/a.jpg") == "a"
+    assert await cache.get("/c.jpg") == "c"
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_poster_cache_get_many_in_one_round_trip(fake_redis):
+    cache = PosterCache(maxsize=10)
+    await cache.set_many({"/a.jpg": "a", "/b.jpg": "b"})
+
+    assert await cache.get_many(["/a.jpg", "/x.jpg", "/b.jpg"]) == ["a", None, "b"]
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
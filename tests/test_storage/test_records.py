@@ -0,0 +1,46 @@
+import pytest
+
+from rbot.storage.models import Movie, Serie
+from rbot.storage.records import TitleRecord, intern_number
+
+
+@pytest.mark.parametrize(
+    "model",
+    (
+        Movie(
+            id=603,
+            tmdbId=603,
+            title="The Matrix",
+            release_date="1999-03-31",
+            vote_average=8.14,
+            backdrop_path="/hEpWvX6Bp79e.l0qAid8z0JFfMG.jpg",
+        ),
+        Movie(id=1, tmdbId=604, title="No imdb", year=2003, ratings={"tmdb": {}}),
+        Serie(id=1399, name="GoT", year=2011, vote_average=8.4, vote_count=21000),
+    ),
+)
+def test_record_roundtrip_renders_the_same(model):
+    record = TitleRecord.from_model(model)
+    rebuilt = record.to_model()
+
+    assert type(rebuilt) is type(model)
+    assert str(rebuilt) == str(model)
+    assert rebuilt.poster == model.poster
+    assert TitleRecord.from_model(rebuilt) == record
+
+
+def test_record_is_compact_and_read_only():
+    first = TitleRecord("movie", 1, 603, "The Matrix", 1999, 8.1, "/poster.jpg")
+    second = TitleRecord("movie", 2, 604, "The Matrix", 1999, 8.1, "/poster.jpg")
+
+    assert not hasattr(first, "__dict__")
+    assert first.title is second.title
+    assert first.year is second.year
+    with pytest.raises(AttributeError):
+        first.title = "Another"
+
+
+def test_equal_numbers_of_another_type_are_interned_apart():
+    assert intern_number(8) == 8
+    assert type(intern_number(8.0)) is float
+    assert intern_number(8.0) is intern_number(8.0)
@@ -0,0 +1,59 @@
+import pytest
+
+from rbot.conf import settings
+from rbot.storage.models import Serie
+from rbot.storage.sessions import (
+    SessionCursor,
+    append_session_page,
+    create_session,
+    read_session,
+    read_session_cursor,
+    read_session_result,
+    session_key,
+)
+from tests.conftest import make_movie
+
+
+@pytest.mark.asyncio
+async def test_session_roundtrip(fake_redis):
+    movies = [make_movie(i) for i in range(3)]
+    search_id = await create_session(1234, movies)
+
+    movie = await read_session_result(1234, search_id, 2)
+
+    assert movie == movies[2]
+    assert await read_session_result(1234, search_id, 3) is None
+    ttl = await fake_redis.ttl(session_key(1234, search_id))
+    assert 0 < ttl <= settings.SEARCH_SESSION_TTL
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_isolated_per_chat(fake_redis):
+    first = await create_session(1, [make_movie(1)])
+    second = await create_session(2, [make_movie(2)])
+
+    assert (await read_session_result(1, first, 0)).title == "Movie 1"
+    assert (await read_session_result(2, second, 0)).title == "Movie 2"
+    assert await read_session_result(2, first, 0) is None
+
+
+@pytest.mark.asyncio
+async def test_session_keeps_result_kind(fake_redis):
+    serie = Serie(id=1399, name="Game of Thrones", year=2011, vote_average=8.4)
+    search_id = await create_session(1234, [serie])
+
+    assert isinstance(await read_session_result(1234, search_id, 0), Serie)
+
+
+@pytest.mark.asyncio
+async def test_session_pages_are_appended_behind_the_cursor(fake_redis):
+    search_id = await create_session(1234, [make_movie(0), make_movie(1)], "x", 3)
+    cursor = await read_session_cursor(1234, search_id)
+    assert cursor == SessionCursor("movie", "x", 1, 3, 2)
+
+    await append_session_page(1234, search_id, cursor, [make_movie(2)])
+
+    movie, cursor = await read_session(1234, search_id, 2)
+    assert movie == make_movie(2)
+    assert cursor == SessionCursor("movie", "x", 2, 3, 3)
+    assert cursor.has_more
@@ -0,0 +1,59 @@
+import pytest
+from pydantic import TypeAdapter
+
+from rbot.storage.models import Movie
+from rbot.tmdb.cache import MISSING, ResponseCache, normalize_query
+from tests.conftest import make_movie
+
+movie_list = TypeAdapter(list[Movie])
+
+
+def test_normalize_query():
+    assert normalize_query("  The   MATRIX ") == normalize_query("the matrix")
+
+
+@pytest.mark.asyncio
+async def test_cache_tiers(fake_redis):
+    cache = ResponseCache(maxsize=10)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return [make_movie()]
+
+    first = await cache.get_or_fetch("search/movie:the matrix", movie_list, 60, fetch)
+    second = await cache.get_or_fetch("search/movie:the matrix", movie_list, 60, fetch)
+    cache.clear()
+    third = await cache.get_or_fetch("search/movie:the matrix", movie_list, 60, fetch)
+
+    assert len(calls) == 1
+    assert first == second == third
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 1
+    assert cache.stats.redis_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_negative_results(fake_redis):
+    cache = ResponseCache(maxsize=10)
+
+    async def fetch():
+        return []
+
+    await cache.get_or_fetch("search/movie:nothing", movie_list, 60, fetch)
+
+    assert await cache.get("search/movie:nothing", movie_list) == []
+    assert 0 < await fake_redis.ttl("rbot:tmdb:search/movie:nothing") <= 10 * 60
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(fake_redis):
+    cache = ResponseCache(maxsize=2)
+    for title in ("a", "b"):
+        await cache.set(title, [make_movie(title=title)], movie_list, 60)
+    await cache.get("a", movie_list)
+    await cache.set("c", [make_movie(title="c")], movie_list, 60)
+
+    assert cache.stats.evictions == 1
+    assert cache._get_local("b") is MISSING
+    assert cache._get_local("a") is not MISSING
@@ -0,0 +1,34 @@
+from rbot.tmdb.images import ImageConfig
+from tests.conftest import make_movie
+
+CONFIGURATION = {
+    "images": {
+        "secure_base_url": "https://image.tmdb.org/t/p/",
+        "poster_sizes": ["w92", "w154", "w185", "w342", "w780", "original"],
+        "backdrop_sizes": ["w300", "w780", "w1280", "original"],
+    }
+}
+
+
+def test_poster_url_uses_context_size():
+    images = ImageConfig()
+    movie = make_movie(poster_path="/poster.jpg")
+
+    assert images.poster_url(movie) == "https://image.tmdb.org/t/p/w500/poster.jpg"
+    assert images.poster_url(movie, "thumb").endswith("/w185/poster.jpg")
+    assert images.poster_url(movie, "unknown").endswith("/original/poster.jpg")
+
+
+def test_poster_url_picks_the_closest_available_size():
+    images = ImageConfig()
+    images.load(CONFIGURATION)
+
+    poster = make_movie(poster_path="/poster.jpg")
+    backdrop = make_movie(backdrop_path="/backdrop.jpg")
+
+    assert images.poster_url(poster).endswith("/w780/poster.jpg")
+    assert images.poster_url(backdrop, "thumb").endswith("/w300/backdrop.jpg")
+
+
+def test_poster_url_without_images():
+    assert ImageConfig().poster_url(make_movie()) == "https://image.tmdb.org/"
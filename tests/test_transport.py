@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import pytest
+
+from rbot.transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientTransport,
+    RetryBudget,
+)
+
+
+class FaultyBackend:
+    """Local stub: answers from a script of faults, then 200s."""
+
+    def __init__(self, *faults: int | type[Exception] | float) -> None:
+        self.faults = list(faults)
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        fault = self.faults.pop(0) if self.faults else 200
+        if isinstance(fault, type):
+            raise fault("injected", request=request)
+        if isinstance(fault, float):
+            await asyncio.sleep(fault)
+            fault = 200
+        return httpx.Response(fault, json={"request": self.requests})
+
+
+def make_client(backend: FaultyBackend, **kwargs) -> httpx.AsyncClient:
+    kwargs.setdefault("backoff", 0)
+    transport = ResilientTransport(httpx.MockTransport(backend), **kwargs)
+    return httpx.AsyncClient(transport=transport, base_url="http://radarr")
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    backend = FaultyBackend(httpx.ConnectError, 503)
+    async with make_client(backend, retries=2) as client:
+        response = await client.get("/movie")
+
+    assert response.status_code == 200
+    assert backend.requests == 3
+    assert client._transport.stats.retries == 2
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_requests_are_only_retried_when_never_sent():
+    backend = FaultyBackend(httpx.ConnectError, httpx.ReadTimeout)
+    async with make_client(backend, retries=2) as client:
+        with pytest.raises(httpx.ReadTimeout):
+            await client.post("/movie", json={})
+
+    assert backend.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_when_the_budget_is_spent():
+    backend = FaultyBackend(*[503] * 10)
+    budget = RetryBudget(ratio=0, minimum=1)
+    async with make_client(backend, retries=5, budget=budget) as client:
+        first = await client.get("/movie")
+        second = await client.get("/movie")
+
+    assert (first.status_code, second.status_code) == (503, 503)
+    assert backend.requests == 3
+    assert client._transport.stats.budget_exhausted == 2
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_while_the_backend_is_down():
+    backend = FaultyBackend(*[httpx.ConnectError] * 3)
+    transport = ResilientTransport(httpx.MockTransport(backend), retries=0)
+    transport.breakers["radarr"] = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://radarr"
+    ) as client:
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await client.get("/movie")
+        with pytest.raises(CircuitOpenError):
+            await client.get("/movie")
+
+    breaker = transport.breakers["radarr"]
+    assert breaker.state == CircuitBreaker.OPEN
+    assert (breaker.stats.opened, breaker.stats.rejected) == (1, 1)
+    assert backend.requests == 2
+
+
+def test_breaker_probes_once_after_the_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.failure()
+
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_slow_gets_are_hedged():
+    backend = FaultyBackend(1.0)
+    async with make_client(backend, hedge_after=0.01) as client:
+        response = await client.get("/movie")
+
+    assert response.json() == {"request": 2}
+    stats = client._transport.stats
+    assert (stats.hedges, stats.hedge_wins) == (1, 1)
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from telegram.ext import ApplicationBuilder
+
+from rbot.webhook import MAX_BODY_SIZE, WebhookApp
+
+SECRET = "s3cr3t"
+
+
+def recorded_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 1234, "type": "private"},
+            "from": {"id": 1234, "is_bot": False, "first_name": "Edu"},
+            "text": "/search the matrix",
+        },
+    }
+
+
+def make_app(
+    maxsize: int = 10, queue_timeout: float = 1.0, secret: str = SECRET
+) -> WebhookApp:
+    application = (
+        ApplicationBuilder()
+        .token("1234:blah")
+        .updater(None)
+        .update_queue(asyncio.Queue(maxsize=maxsize))
+        .build()
+    )
+    return WebhookApp(application, "/telegram", secret, queue_timeout)
+
+
+def make_client(app: WebhookApp) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app)  # type: ignore
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    return httpx.AsyncClient(
+        transport=transport, base_url="http://bot", headers=headers
+    )
+
+
+@pytest.mark.asyncio
+async def test_webhook_queues_recorded_updates():
+    app = make_app()
+    async with make_client(app) as client:
+        response = await client.post("/telegram", json=recorded_update(1))
+
+    assert response.status_code == 200
+    update = app.application.update_queue.get_nowait()
+    assert update.update_id == 1
+    assert update.effective_chat.id == 1234
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "headers, body, status",
+    [
+        ({"X-Telegram-Bot-Api-Secret-Token": "wrong"}, "{}", 403),
+        ({}, "not json", 400),
+        ({}, json.dumps([1, 2]), 400),
+        ({}, "x" * (MAX_BODY_SIZE + 1), 413),
+    ],
+)
+async def test_webhook_rejects_bad_requests(headers, body, status):
+    app = make_app()
+    async with make_client(app) as client:
+        response = await client.post("/telegram", content=body, headers=headers)
+
+    assert response.status_code == status
+    assert app.application.update_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_webhook_absorbs_a_burst_without_dropping_updates():
+    app = make_app(maxsize=5)
+    queue = app.application.update_queue
+    received = []
+
+    async def consume() -> None:
+        while len(received) < 200:
+            received.append((await queue.get()).update_id)
+            await asyncio.sleep(0)
+
+    async with make_client(app) as client:
+        consumer = asyncio.create_task(consume())
+        responses = await asyncio.gather(
+            *(client.post("/telegram", json=recorded_update(i)) for i in range(200))
+        )
+        await consumer
+
+    assert {response.status_code for response in responses} == {200}
+    assert sorted(received) == list(range(200))
+
+
+@pytest.mark.asyncio
+async def test_webhook_asks_telegram_to_retry_when_the_queue_stays_full():
+    app = make_app(maxsize=1, queue_timeout=0.01)
+    async with make_client(app) as client:
+        first = await client.post("/telegram", json=recorded_update(1))
+        second = await client.post("/telegram", json=recorded_update(2))
+
+    assert (first.status_code, second.status_code) == (200, 503)
+    assert app.stats.throttled == 1
+
+
+@pytest.mark.asyncio
+async def test_webhook_without_a_configured_secret_still_requires_one():
+    app = make_app(secret="")
+    async with make_client(app) as client:
+        response = await client.post(
+            "/telegram",
+            json=recorded_update(1),
+            headers={"X-Telegram-Bot-Api-Secret-Token": ""},
+        )
+
+    assert app.secret
+    assert response.status_code == 403